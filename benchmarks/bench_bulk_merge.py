@@ -0,0 +1,102 @@
+"""
+Securities upsert: dataframe_upsert (to_dict + executemany in chunks) vs
+bulk_merge (Arrow -> COPY into a temp table -> one INSERT ... ON CONFLICT).
+
+Needs DB_URI. Works against a TEMP `securities` that shadows the real one
+for the session, so nothing persistent is touched.
+
+    python -m benchmarks.bench_bulk_merge --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+from etl.scripts.utilities.upsert import bulk_merge, dataframe_upsert
+from etl.sql_scripts.securities import MERGE_SECURITIES, UPSERT_SQL
+
+load_dotenv()
+
+SHADOW_SECURITIES = """
+create temp table securities(
+    cik          bigint primary key,
+    ticker       varchar(7)  not null,
+    name         varchar(40) not null,
+    exchange     varchar(15) not null,
+    company_name varchar(50) not null,
+    symbol_yf    varchar(7)  not null,
+    first_seen   date        not null,
+    last_seen    date        not null
+)
+"""
+COLS = ["cik", "ticker", "name", "exchange", "company_name", "symbol_yf", "first_seen", "last_seen"]
+
+
+def synthetic(n: int, day: date) -> pd.DataFrame:
+    i = np.arange(n)
+    tick = pd.Series(i).map(lambda k: f"T{k:06d}")
+    return pd.DataFrame({
+        "cik": i + 1,
+        "ticker": tick,
+        "name": "Name " + tick,
+        "exchange": np.where(i % 3, "NYSE", "NASDAQ"),
+        "company_name": "Company " + tick,
+        "symbol_yf": tick,
+        "first_seen": day,
+        "last_seen": day,
+    })
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    secs = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return secs, peak / 1e6, out
+
+
+def run(engine, n: int, legacy_limit: int):
+    first = synthetic(n, date(2026, 1, 1))
+    # next day: everything seen again, every 10th row renamed
+    second = first.assign(last_seen=date(2026, 1, 2))
+    second.loc[second.index % 10 == 0, "name"] += " (renamed)"
+
+    line = f"{n:>9,} rows |"
+    with engine.connect() as conn:
+        conn.execute(text(SHADOW_SECURITIES))
+        t_ins, mb_ins, (ins, _) = measure(lambda: bulk_merge(conn, first, "securities", MERGE_SECURITIES, COLS))
+        t_upd, mb_upd, (_, upd) = measure(lambda: bulk_merge(conn, second, "securities", MERGE_SECURITIES, COLS))
+        conn.rollback()
+        line += (f" bulk_merge insert {t_ins:6.2f}s ({ins:,}, py peak {mb_ins:6.1f} MB)"
+                 f" update {t_upd:6.2f}s ({upd:,}, py peak {mb_upd:6.1f} MB)")
+    if n <= legacy_limit:
+        with engine.connect() as conn:
+            conn.execute(text(SHADOW_SECURITIES))
+            t_li, mb_li, _ = measure(lambda: dataframe_upsert(conn, first, UPSERT_SQL, chunk_size=1000))
+            t_lu, mb_lu, _ = measure(lambda: dataframe_upsert(conn, second, UPSERT_SQL, chunk_size=1000))
+            conn.rollback()
+        line += f" | executemany insert {t_li:6.2f}s ({mb_li:6.1f} MB) update {t_lu:6.2f}s ({mb_lu:6.1f} MB)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-limit", type=int, default=100_000,
+                        help="skip dataframe_upsert above this many rows (executemany is very slow)")
+    args = parser.parse_args()
+    engine = create_engine(os.environ["DB_URI"])
+    for n in args.sizes:
+        run(engine, n, args.legacy_limit)
+
+
+if __name__ == "__main__":
+    main()
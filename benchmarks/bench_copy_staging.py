@@ -0,0 +1,83 @@
+"""
+Compare the binary and CSV COPY paths into staging_fundamentals.
+
+Each format runs in its own subprocess so peak RSS is not shared between
+them. Needs DATABASE_URL; rows go into a TEMP session staging table, so
+nothing persistent is touched.
+
+    python -m benchmarks.bench_copy_staging --rows 1000000
+"""
+import argparse
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+import psycopg
+
+from etl.scripts.fundamentals.config import DATABASE_URL
+from etl.scripts.fundamentals.staging import create_session_staging, copy_rows_to_staging
+
+
+def synthetic_rows(n: int) -> list[tuple]:
+    rnd = random.Random(42)
+    tags = ["AssetsCurrent", "Liabilities", "NetIncomeLoss", "EarningsPerShareDiluted"]
+    base = date(2010, 1, 1)
+    return [
+        (
+            1000 + i // 500,
+            f"0000{i // 50:06d}-{10 + i % 14}-{i % 999999:06d}",
+            2010 + i % 14,
+            "FY",
+            tags[i % len(tags)],
+            rnd.random() * 1e9,
+            "USD",
+            f"CY{2010 + i % 14}" if i % 3 else None,
+            base + timedelta(days=i % 5000),
+            f"CIK{1000 + i // 500:010d}.json",
+        )
+        for i in range(n)
+    ]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_one(copy_format: str, n: int, chunk: int):
+    rows = synthetic_rows(n)
+    base_rss = _peak_rss_mb()
+    with psycopg.connect(DATABASE_URL, autocommit=False) as conn:
+        staging = create_session_staging(conn, kind="temp")
+        t0 = time.perf_counter()
+        for start in range(0, n, chunk):
+            copy_rows_to_staging(conn, staging, rows[start:start + chunk], copy_format=copy_format)
+        elapsed = time.perf_counter() - t0
+    print(f"{copy_format:>6}: {n / elapsed:>12,.0f} rows/s | "
+          f"{elapsed:.2f}s | peak RSS +{_peak_rss_mb() - base_rss:.1f} MiB over row data")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--chunk", type=int, default=100_000)
+    parser.add_argument("--mode", choices=("binary", "csv"), help="run a single format in-process")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_one(args.mode, args.rows, args.chunk)
+        return
+
+    for fmt in ("csv", "binary"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_copy_staging",
+             "--mode", fmt, "--rows", str(args.rows), "--chunk", str(args.chunk)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
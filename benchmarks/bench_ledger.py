@@ -0,0 +1,113 @@
+"""
+Ledger lookups/upserts: IN-literal + executemany vs temp-table COPY + join.
+
+Needs DATABASE_URL. Works against a TEMP etl_source_ledger that shadows
+the real one for the session, so nothing persistent is touched.
+
+    python -m benchmarks.bench_ledger --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+from psycopg import sql
+
+from etl.scripts.fundamentals.config import DATABASE_URL
+from etl.scripts.fundamentals.ledger import ledger_bulk_diff, ledger_bulk_upsert
+from etl.sql_scripts.fundamentals import LEDGER_UPSERT
+
+
+SHADOW_LEDGER = """
+CREATE TEMP TABLE etl_source_ledger (
+  source_kind   TEXT NOT NULL,
+  natural_key   TEXT NOT NULL,
+  asset_path    TEXT NOT NULL,
+  byte_size     BIGINT,
+  crc32         BIGINT,
+  sha256        CHAR(64),
+  last_modified TIMESTAMPTZ,
+  etag          TEXT,
+  processed_at  TIMESTAMPTZ,
+  status        TEXT NOT NULL DEFAULT 'ok',
+  PRIMARY KEY (source_kind, natural_key)
+)
+"""
+
+
+def synthetic_metas(n: int, salt: int = 0) -> list[dict]:
+    t = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "natural_key": f"{i:010d}",
+            "asset_path": f"CIK{i:010d}.json",
+            "byte_size": 10_000 + i,
+            "crc32": (i * 2654435761 + salt) & 0xFFFFFFFF,
+            "sha256": None,
+            "last_modified": t + timedelta(seconds=i % 86400),
+            "etag": None,
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_get(conn, source_kind: str, keys: list[str]) -> dict:
+    # the pre-temp-table implementation, kept here for comparison
+    placeholders = sql.SQL(",").join(sql.Literal(k) for k in keys)
+    q = sql.SQL("""
+        SELECT natural_key, asset_path, byte_size, crc32, last_modified
+        FROM etl_source_ledger
+        WHERE source_kind = {sk} AND natural_key IN ({keys})
+    """).format(sk=sql.Literal(source_kind), keys=placeholders)
+    with conn.cursor() as cur:
+        cur.execute(q)
+        return {r[0]: r for r in cur.fetchall()}
+
+
+def legacy_upsert(conn, source_kind: str, metas: list[dict]):
+    with conn.cursor() as cur:
+        cur.executemany(LEDGER_UPSERT, [
+            (source_kind, m["natural_key"], m["asset_path"], m["byte_size"], m["crc32"],
+             m["sha256"], m["last_modified"], m["etag"], "ok")
+            for m in metas
+        ])
+
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def run(n: int, legacy_limit: int):
+    kind = "bench"
+    seeded = synthetic_metas(n)
+    # ~10% of candidates change between runs
+    current = [m if i % 10 else {**m, "crc32": m["crc32"] ^ 1} for i, m in enumerate(seeded)]
+    with psycopg.connect(DATABASE_URL, autocommit=False) as conn:
+        with conn.cursor() as cur:
+            cur.execute(SHADOW_LEDGER)
+        t_copy_up = timed(lambda: ledger_bulk_upsert(conn, kind, seeded, "ok"))
+        conn.commit()
+        t_diff = timed(lambda: ledger_bulk_diff(conn, kind, current))
+        line = f"{n:>9,} keys | copy upsert {t_copy_up:7.2f}s | temp-join diff {t_diff:7.2f}s"
+        if n <= legacy_limit:
+            t_in = timed(lambda: legacy_get(conn, kind, [m["natural_key"] for m in current]))
+            t_em = timed(lambda: legacy_upsert(conn, kind, seeded))
+            conn.rollback()
+            line += f" | IN-literal get {t_in:7.2f}s | executemany upsert {t_em:7.2f}s"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-limit", type=int, default=100_000,
+                        help="skip the legacy paths above this many keys (executemany is very slow)")
+    args = parser.parse_args()
+    for n in args.sizes:
+        run(n, args.legacy_limit)
+
+
+if __name__ == "__main__":
+    main()
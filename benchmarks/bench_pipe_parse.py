@@ -0,0 +1,77 @@
+"""
+Nasdaq Trader pipe file parsing: read_csv(engine='python', skipfooter=1,
+dtype=str) vs the byte-level footer strip + Arrow reader, on a synthetic
+otherlisted.txt-shaped file.
+
+    python -m benchmarks.bench_pipe_parse --rows 7000 50000
+"""
+import argparse
+import io
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+from etl.scripts.securities.build_security_master import _read_pipe_table
+
+_HEADER = "ACT Symbol|Security Name|Exchange|CQS Symbol|ETF|Round Lot Size|Test Issue|NASDAQ Symbol"
+
+
+def make_file(rows: int) -> bytes:
+    rnd = random.Random(11)
+    lines = [_HEADER]
+    for i in range(rows):
+        sym = "".join(rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(rnd.randint(1, 4)))
+        name = f"{sym.title()} Holdings Corp. Class {rnd.choice('AB')} Common Stock"
+        lines.append(f"{sym}|{name}|{rnd.choice('ANPZ')}|{sym}|{rnd.choice('YN')}|100|N|{sym}")
+    lines.append("File Creation Time: 1017202618:01|||||||")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def legacy(raw: bytes) -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(raw.decode()), sep="|", engine="python", skipfooter=1, dtype=str)
+
+
+def measure(fn, raw: bytes, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        df = fn(raw)
+        best = min(best, time.perf_counter() - t0)
+        del df
+    tracemalloc.start()
+    pool = pa.default_memory_pool()
+    arrow0 = pool.bytes_allocated()
+    df = fn(raw)
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow = pool.bytes_allocated() - arrow0
+    return best, df, py_peak, arrow, int(df.memory_usage(deep=True).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[7000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        raw = make_file(rows)
+        t_old, df_old, py_old, ar_old, mem_old = measure(legacy, raw, args.repeat)
+        t_new, df_new, py_new, ar_new, mem_new = measure(_read_pipe_table, raw, args.repeat)
+        # the old path turned tickers like "NA" into NaN; the Arrow reader keeps them
+        old_rows = df_old.astype(object).fillna("").values.tolist()
+        new_rows = df_new.astype(object).values.tolist()
+        diff = [b for a, b in zip(old_rows, new_rows) if a != b]
+        assert len(old_rows) == len(new_rows) and all(r[0] in pd.io.parsers.readers.STR_NA_VALUES for r in diff)
+        print(f"rows={rows:,} ({len(raw) / 1e6:.1f} MB), {len(diff)} NA-like tickers no longer lost")
+        print(f"  python engine: {t_old * 1000:8.1f} ms  frame {mem_old / 1e6:6.1f} MB  "
+              f"peak py {py_old / 1e6:6.1f} MB")
+        print(f"  arrow reader:  {t_new * 1000:8.1f} ms  frame {mem_new / 1e6:6.1f} MB  "
+              f"peak py {py_new / 1e6:6.1f} MB + arrow {ar_new / 1e6:.1f} MB  ({t_old / t_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
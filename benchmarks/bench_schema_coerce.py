@@ -0,0 +1,125 @@
+"""
+Securities frame cleaning: the old _clean_cik_column / _coerce_required_strings
+/ _trim_to_limits chain (regex passes over str-cast CIKs, a per-row int(),
+astype(str) per column, twice) vs schema.coerce(SECURITIES_SCHEMA), on a
+synthetic security-master-shaped frame with some junk CIKs.
+
+    python -m benchmarks.bench_schema_coerce --rows 100000 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from etl.scripts.utilities.schema import Column, coerce
+
+# copy of update_securities_db.SECURITIES_SCHEMA; importing that module
+# needs DB_URI and builds an engine
+SECURITIES_SCHEMA = [
+    Column("cik", pa.int64(), nullable=False, min=1, max=9_999_999_999, clean=r"\D"),
+    Column("ticker", pa.string(), nullable=False, max_len=7, truncate=True),
+    Column("name", pa.string(), nullable=False, max_len=40, truncate=True),
+    Column("exchange", pa.string(), nullable=False, max_len=15, truncate=True),
+    Column("company_name", pa.string(), nullable=False, max_len=50, truncate=True),
+    Column("symbol_yf", pa.string(), nullable=False, max_len=7, truncate=True),
+]
+
+
+# --- the pre-schema code from update_securities_db, verbatim ---------------
+
+def _trim_to_limits(df: pd.DataFrame) -> pd.DataFrame:
+    limits = {"ticker": 7, "name": 40, "exchange": 15, "company_name": 50, "symbol_yf": 7}
+    for col, lim in limits.items():
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().str.slice(0, lim)
+    return df
+
+
+def _parse_cik(col: pd.Series) -> pd.Series:
+    s = col.astype(str).str.strip()
+    s = s.str.replace(r"\.0$", "", regex=True)
+    s = s.str.replace(r"\D", "", regex=True)
+    s = s.replace("", pd.NA)
+    return pd.to_numeric(s, errors="coerce")
+
+
+def _clean_cik_column(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df["cik"] = _parse_cik(df["cik"])
+    bad_mask = df["cik"].isna() | (df["cik"] < 1) | (df["cik"] > 9_999_999_999)
+    df = df.loc[~bad_mask]
+    df["cik"] = df["cik"].astype("Int64").astype(object).apply(lambda x: int(x))
+    return df
+
+
+def _coerce_required_strings(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.rename(columns={"symbol": "ticker", "security_name": "name"})
+    for c in ["ticker", "name", "exchange", "company_name", "symbol_yf"]:
+        df[c] = df[c].astype(str).str.strip()
+    return df
+
+
+def legacy(df: pd.DataFrame) -> pd.DataFrame:
+    return _trim_to_limits(_coerce_required_strings(_clean_cik_column(df)))
+
+
+def schema(df: pd.DataFrame):
+    return coerce(df.rename(columns={"symbol": "ticker", "security_name": "name"}), SECURITIES_SCHEMA)
+
+
+# ---------------------------------------------------------------------------
+
+def make_frame(rows: int) -> pd.DataFrame:
+    rnd = np.random.default_rng(7)
+    cik = rnd.integers(1, 2_000_000, rows).astype(str).astype(object)
+    # the kinds of junk the SEC map / CSV round trips produce
+    junk = rnd.random(rows)
+    cik[junk < 0.02] = "1374310.0"
+    cik[(junk >= 0.02) & (junk < 0.03)] = ""
+    cik[(junk >= 0.03) & (junk < 0.035)] = "0"
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    sym = pd.Series(["".join(letters[rnd.integers(0, 26, k)]) for k in rnd.integers(1, 6, rows)])
+    return pd.DataFrame({
+        "symbol": " " + sym,
+        "security_name": sym + " Holdings Corporation Class A Common Stock, par value $0.01",
+        "exchange": np.where(rnd.random(rows) < 0.5, "NASDAQ", "NYSE"),
+        "symbol_yf": sym,
+        "cik": cik,
+        "company_name": sym + " Holdings Corporation of Delaware and Subsidiaries Inc",
+    })
+
+
+def measure(fn, df):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(df)
+    secs = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return secs, peak / 1e6, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for n in args.rows:
+        df = make_frame(n)
+        t_old, mb_old, old = measure(legacy, df)
+        t_new, mb_new, (new, rejected) = measure(schema, df)
+
+        cols = [c.name for c in SECURITIES_SCHEMA]
+        same = (len(old) == len(new)
+                and old["cik"].tolist() == new["cik"].tolist()
+                and all(old[c].tolist() == new[c].tolist() for c in cols[1:]))
+        print(f"{n:>9,} rows | legacy {t_old * 1000:8.0f} ms (py peak {mb_old:6.1f} MB)"
+              f" | coerce {t_new * 1000:7.0f} ms (py peak {mb_new:6.1f} MB)"
+              f" | {t_old / t_new:4.1f}x | kept {len(new):,} rejected {len(rejected):,} | same rows: {same}")
+
+
+if __name__ == "__main__":
+    main()
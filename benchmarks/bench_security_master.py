@@ -0,0 +1,126 @@
+"""
+Building the security master from its three sources (nasdaqlisted,
+otherlisted, SEC company_tickers.json) served by a local stand-in with a
+fixed per-response latency: sequential vs concurrent fetch, a warm cache
+(three 304s), and --offline (cache only).
+
+    python -m benchmarks.bench_security_master --rows 6000 --latency-ms 250
+"""
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import etl.scripts.securities.build_security_master as bsm
+
+_NAS_HEADER = "Symbol|Security Name|Market Category|Test Issue|Financial Status|Round Lot Size|ETF|NextShares"
+_OTHER_HEADER = "ACT Symbol|Security Name|Exchange|CQS Symbol|ETF|Round Lot Size|Test Issue|NASDAQ Symbol"
+_FOOTER = "File Creation Time: 1017202618:01"
+
+
+def make_sources(rows: int):
+    rnd = random.Random(5)
+    syms = set()
+    while len(syms) < 2 * rows:
+        syms.add("".join(rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(rnd.randint(1, 5))))
+    syms = sorted(syms)
+    kinds = ["Common Stock"] * 8 + ["Warrant", "Units", "Depositary Shares", "5.25% Notes due 2030"]
+    nas = [_NAS_HEADER] + [f"{s}|{s.title()} Inc. - {rnd.choice(kinds)}|Q|N|N|100|{rnd.choice('NNNNY')}|N"
+                           for s in syms[:rows]]
+    other = [_OTHER_HEADER] + [f"{s}|{s.title()} Corp. {rnd.choice(kinds)}|{rnd.choice('ANPZ')}|{s}|"
+                               f"{rnd.choice('NNNNY')}|100|N|{s}" for s in syms[rows:]]
+    tickers = {str(i): {"cik_str": 1000 + i, "ticker": s, "title": f"{s.title()} Inc"}
+               for i, s in enumerate(syms) if rnd.random() < 0.9}
+    return {
+        "/nasdaqlisted.txt": ("\r\n".join(nas + [_FOOTER + "|" * 7]) + "\r\n").encode(),
+        "/otherlisted.txt": ("\r\n".join(other + [_FOOTER + "|" * 7]) + "\r\n").encode(),
+        "/company_tickers.json": json.dumps(tickers).encode(),
+    }
+
+
+def make_server(files: dict, latency: float):
+    hits = {"200": 0, "304": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = files[self.path]
+            etag = f'"{hash(body) & 0xffffffff:x}"'
+            fresh = self.headers.get("If-None-Match") == etag
+            with lock:
+                hits["304" if fresh else "200"] += 1
+            self.send_response(304 if fresh else 200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0" if fresh else str(len(body)))
+            self.end_headers()
+            if not fresh:
+                self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+
+def build(sources):
+    df = bsm.build_security_master(sources=sources)
+    return bsm.enrich_with_cik(df, sources["sec_tickers"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=6000, help="rows per listing file")
+    parser.add_argument("--latency-ms", dest="latency_ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    server, hits = make_server(make_sources(args.rows), args.latency_ms / 1000)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    bsm.NASDAQ_NASDAQ_URL = base + "/nasdaqlisted.txt"
+    bsm.NASDAQ_OTHER_URL = base + "/otherlisted.txt"
+    bsm.SEC_TICKERS_URL = base + "/company_tickers.json"
+
+    def sequential(offline=False):
+        return {"nasdaqlisted": bsm.load_nasdaqlisted(offline),
+                "otherlisted": bsm.load_otherlisted(offline),
+                "sec_tickers": bsm.load_sec_company_tickers(offline)}
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as cold_seq, tempfile.TemporaryDirectory() as d:
+            for label, cache_dir, fetch in [
+                ("sequential, cold cache", cold_seq, sequential),
+                ("concurrent, cold cache", d, bsm.fetch_sources),
+                ("concurrent, warm (304s)", d, bsm.fetch_sources),
+                ("offline", d, lambda: bsm.fetch_sources(offline=True)),
+            ]:
+                bsm.SECURITIES_CACHE_DIR = cache_dir
+                before = dict(hits)
+                t0 = time.perf_counter()
+                sources = fetch()
+                t1 = time.perf_counter()
+                master = build(sources)
+                t2 = time.perf_counter()
+                results.append((label, t1 - t0, t2 - t1, len(master),
+                                hits["200"] - before["200"], hits["304"] - before["304"]))
+                if len(results) > 1:
+                    assert len(master) == results[0][3]
+    finally:
+        server.shutdown()
+
+    print(f"\nrows per listing={args.rows:,}, latency={args.latency_ms:.0f} ms")
+    for label, fetch_s, build_s, n, full, not_mod in results:
+        print(f"  {label:<25} fetch {fetch_s * 1000:7.1f} ms  build {build_s * 1000:6.1f} ms  "
+              f"({full} x 200, {not_mod} x 304)  {n:,} securities")
+
+
+if __name__ == "__main__":
+    main()
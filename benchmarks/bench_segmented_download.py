@@ -0,0 +1,91 @@
+"""
+Segmented Range download vs a single stream, against a local stand-in for
+the SEC server. The server caps each connection's bandwidth (the way a
+far-away CDN edge does), so extra segments only help by running in parallel.
+
+    python -m benchmarks.bench_segmented_download --mb 64 --per-conn-mbps 40 --segments 1 2 4 8
+"""
+import argparse
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from etl.scripts.fundamentals.fetch_fund import download_segmented
+from etl.scripts.utilities.http import HttpClient
+
+_RANGE = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+def make_handler(blob: bytes, per_conn_bps: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, like the real thing
+
+        def log_message(self, *args):
+            pass
+
+        def _headers(self, code: int, length: int, extra: dict):
+            self.send_response(code)
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", '"bench"')
+            for k, v in extra.items():
+                self.send_header(k, v)
+            self.end_headers()
+
+        def do_HEAD(self):
+            self._headers(200, len(blob), {})
+
+        def do_GET(self):
+            start, end = 0, len(blob) - 1
+            m = _RANGE.match(self.headers.get("Range", ""))
+            if m:
+                start = int(m.group(1))
+                end = min(int(m.group(2)) if m.group(2) else end, len(blob) - 1)
+                self._headers(206, end - start + 1, {"Content-Range": f"bytes {start}-{end}/{len(blob)}"})
+            else:
+                self._headers(200, len(blob), {})
+            step = 256 * 1024
+            for a in range(start, end + 1, step):
+                piece = blob[a:min(a + step, end + 1)]
+                self.wfile.write(piece)
+                time.sleep(len(piece) / per_conn_bps)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=64, help="size of the served file")
+    parser.add_argument("--per-conn-mbps", type=float, default=40.0, help="bandwidth cap per connection (MB/s)")
+    parser.add_argument("--segments", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rps", type=float, default=10.0, help="global request rate limit")
+    args = parser.parse_args()
+
+    blob = os.urandom(args.mb * 1024 * 1024)
+    want = hashlib.sha256(blob).hexdigest()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(blob, args.per_conn_mbps * 1e6))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/companyfacts.zip"
+
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            for n in args.segments:
+                dest = os.path.join(d, f"cf_{n}.zip")
+                t0 = time.perf_counter()
+                download_segmented(url, dest, len(blob), stamp='"bench"', segments=n,
+                                   connections=n, client=HttpClient(rates={"127.0.0.1": (args.rps, 1)}))
+                secs = time.perf_counter() - t0
+                with open(dest, "rb") as f:
+                    ok = hashlib.sha256(f.read()).hexdigest() == want
+                print(f"segments={n:>2}: {secs:6.2f}s  {len(blob) / secs / 1e6:7.1f} MB/s  "
+                      f"{'ok' if ok else 'CORRUPT'}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
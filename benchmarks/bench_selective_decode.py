@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: full orjson decode vs tag-targeted decode of one large
+companyfacts document.
+
+    python -m benchmarks.bench_selective_decode --tags 4000 --facts 80
+"""
+import argparse
+import random
+import time
+
+import orjson
+
+from etl.scripts.fundamentals.config import TAG_MAP
+from etl.scripts.fundamentals.json import extract_rows_from_json
+
+
+def synthetic_filer(n_tags: int, n_facts: int, real_tags: list[str]) -> bytes:
+    rnd = random.Random(7)
+    names = real_tags + [f"SyntheticTag{i:05d}" for i in range(max(0, n_tags - len(real_tags)))]
+    rnd.shuffle(names)
+    us_gaap = {}
+    for t in names:
+        facts = [
+            {
+                "start": f"{2005 + k % 18}-01-01", "end": f"{2005 + k % 18}-12-31",
+                "val": rnd.randint(1, 10**11), "accn": f"0000320193-{5 + k % 18:02d}-{k:06d}",
+                "fy": 2005 + k % 18, "fp": "FY", "form": "10-K", "filed": f"{2006 + k % 18}-02-01",
+                **({"frame": f"CY{2005 + k % 18}"} if k % 2 else {}),
+            }
+            for k in range(n_facts)
+        ]
+        us_gaap[t] = {"label": t, "description": "Synthetic " * 8, "units": {"USD": facts}}
+    doc = {"cik": 320193, "entityName": "Synthetic Inc.",
+           "facts": {"dei": {}, "us-gaap": us_gaap}}
+    return orjson.dumps(doc)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, default=4000, help="us-gaap tags in the document")
+    parser.add_argument("--facts", type=int, default=80, help="facts per tag")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    big_map = dict(TAG_MAP)
+    for i in range(300):
+        big_map[f"Extra{i}"] = [f"SyntheticTag{i * 7:05d}"]
+
+    real = [t for c in TAG_MAP.values() for t in c]
+    raw = synthetic_filer(args.tags, args.facts, real)
+    print(f"document: {len(raw) / 1e6:.1f} MB, {args.tags} tags x {args.facts} facts")
+
+    for label, tag_map in (("TAG_MAP", TAG_MAP), ("TAG_MAP + 300", big_map)):
+        full = best_of(lambda: extract_rows_from_json(1, orjson.loads(raw), "x.json", tag_map), args.repeat)
+        sel = best_of(lambda: extract_rows_from_json(1, raw, "x.json", tag_map), args.repeat)
+        assert extract_rows_from_json(1, raw, "x.json", tag_map) == \
+            extract_rows_from_json(1, orjson.loads(raw), "x.json", tag_map)
+        print(f"{label:>14}: full {full * 1e3:8.1f} ms | selective {sel * 1e3:8.1f} ms | {full / sel:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import argparse
+import traceback
 
-from etl.scripts.fundamentals.fetch_fund import getSECZips
-from etl.scripts.fundamentals.loader import upsert_fundamentals
-from etl.scripts.securities.build_security_master import get_securities_list
-from etl.scripts.securities.update_securities_db import db_update
+from etl.scripts.fundamentals.config import PARSE_WORKERS, WRITE_QUEUE_DEPTH, WRITE_SHARDS
+from etl.scripts.fundamentals.fetch_fund import COMPANYFACTS_URL, SUBMISSIONS_URL, download_zip, sec_zip_path
+from etl.scripts.fundamentals.loader import positive_int, upsert_fundamentals
+from etl.scripts.securities.build_security_master import drop_excluded, get_securities_list, load_sec_company_tickers
+from etl.scripts.securities.update_securities_db import db_update, recheck_unresolved
+from etl.scripts.utilities.dag import DagFailed, Task, run_dag, timing_summary
+from etl.scripts.utilities.http import get_client
 
 
 def parse_args() -> argparse.Namespace:
@@ -20,34 +24,110 @@ def parse_args() -> argparse.Namespace:
         help="Control whether the securities table snapshot is written to 'data/temp/temp_sec_table.csv'.",
     )
 
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=PARSE_WORKERS,
+        help="Processes used to parse companyfacts members (1 = in-process).",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        dest="queue_depth",
+        type=int,
+        default=WRITE_QUEUE_DEPTH,
+        help="Parsed chunks that may wait on the staging writer before parsing blocks.",
+    )
+    parser.add_argument(
+        "--shards",
+        type=positive_int,
+        default=WRITE_SHARDS,
+        help="Database connections the fundamentals merge is spread over (by CIK hash).",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Build the security master from the local listing/ticker cache without any requests.",
+    )
+    parser.add_argument(
+        "--recheck-unresolved",
+        dest="recheck_unresolved",
+        action="store_true",
+        help="Only re-match listings stored without a CIK against the current SEC ticker file, then exit.",
+    )
+
     return parser.parse_args()
 
 
-def run_pipeline(write_csv: bool = False) -> None:
-    """Execute the ETL workflow, optionally exporting a CSV snapshot."""
+def run_pipeline(write_csv: bool = False,
+                 workers: int = PARSE_WORKERS,
+                 queue_depth: int = WRITE_QUEUE_DEPTH,
+                 shards: int = WRITE_SHARDS,
+                 offline: bool = False) -> None:
+    """
+    Execute the ETL workflow, optionally exporting a CSV snapshot.
+
+    Steps run as a small dependency graph: the securities build and both SEC
+    downloads start together, and fundamentals wait only on what they read.
+    """
+
+    def securities():
+        # excluded rows come along (labelled) so the DB step can record them as unresolved
+        return get_securities_list(offline=offline, keep_excluded=True)
+
+    def securities_db(securities):
+        status_sec = db_update(securities)
+        if status_sec != 200:
+            raise RuntimeError(f"securities upsert returned {status_sec}")
+        print("Securities DB Updated")
+
+    def securities_csv(securities):
+        if write_csv:
+            drop_excluded(securities).to_csv("data/temp/temp_sec_table.csv")
+            print("Wrote securities snapshot to data/temp/temp_sec_table.csv")
+        else:
+            print("Skipping securities CSV snapshot (write_csv disabled)")
+
+    def companyfacts():
+        print("Downloading companyfacts...")
+        return download_zip(COMPANYFACTS_URL, sec_zip_path("companyfacts.zip"))
 
-    df = get_securities_list()
-    status_sec = db_update(df)
-    if status_sec != 200:
-        print(f"Error: {status_sec}")
-        return
-    print("Securities DB Updated")
-    print("fetching fundamentals data")
+    def submissions():
+        print("Downloading submissions...")
+        return download_zip(SUBMISSIONS_URL, sec_zip_path("submissions.zip"))
 
-    if write_csv:
-        df.to_csv("data/temp/temp_sec_table.csv")
-        print("Wrote securities snapshot to data/temp/temp_sec_table.csv")
-    else:
-        print("Skipping securities CSV snapshot (write_csv disabled)")
+    def fundamentals(securities, securities_db, companyfacts, submissions):
+        print("Parsing fundamentals zips")
+        upsert_fundamentals(companyfacts, drop_excluded(securities), workers=workers,
+                            queue_depth=queue_depth, shards=shards,
+                            submissions_zip=submissions)
 
-    response = getSECZips()
-    if response["status"] != 200:
-        return
-    print("Finished fetching data")
-    print("Parsing fundamentals zips")
-    upsert_fundamentals(response["cf_path"], df)
+    tasks = [
+        Task("securities", securities),
+        Task("securities_db", securities_db, ("securities",)),
+        Task("securities_csv", securities_csv, ("securities",)),
+        Task("companyfacts", companyfacts),
+        Task("submissions", submissions),
+        # the upsert is ordered after securities_db only because a failed
+        # securities load has always stopped the run here
+        Task("fundamentals", fundamentals, ("securities", "securities_db", "companyfacts", "submissions")),
+    ]
+    try:
+        run_dag(tasks, max_workers=4)
+    except DagFailed as e:
+        for name, err in e.failed.items():
+            print(f"Error in {name}: {err!r}")
+            traceback.print_exception(err)
+        # non-zero exit, like the sequential run, so the scheduled job shows as failed
+        raise SystemExit(1) from e
+    finally:
+        print(timing_summary(tasks))
+        print(get_client().report())
 
 
 if __name__ == "__main__":
     args = parse_args()
-    run_pipeline(write_csv=args.write_csv)
\ No newline at end of file
+    if args.recheck_unresolved:
+        recheck_unresolved(load_sec_company_tickers(offline=args.offline))
+        raise SystemExit(0)
+    run_pipeline(write_csv=args.write_csv, workers=args.workers, queue_depth=args.queue_depth, shards=args.shards,
+                 offline=args.offline)
\ No newline at end of file
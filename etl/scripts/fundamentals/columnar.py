@@ -0,0 +1,176 @@
+from typing import Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from etl.scripts.fundamentals.config import FUND_COLS, NO_FRAME
+from etl.scripts.fundamentals.json import load_us_gaap
+from etl.scripts.utilities.normalize import unit_factor
+from etl.scripts.utilities.schema import Column, coerce
+
+
+# Arrow twin of FUND_COLS / staging_fundamentals
+FUND_SCHEMA = pa.schema([
+    ("cik", pa.int64()),
+    ("accession_no", pa.string()),
+    ("fiscal_year", pa.int32()),
+    ("fiscal_period", pa.string()),
+    ("tag", pa.string()),
+    ("value", pa.float64()),
+    ("unit", pa.string()),
+    ("frame", pa.string()),
+    ("filing_date", pa.date32()),
+    ("source_file", pa.string()),
+])
+assert FUND_SCHEMA.names == FUND_COLS
+
+# NOT NULL columns of fundamentals_raw; a fact missing one (in practice, a
+# filing_date) can't be loaded. Values are already typed, so no trimming.
+_REQUIRED = {"cik", "accession_no", "tag", "filing_date"}
+FUND_COLUMNS = [Column(f.name, f.type, nullable=f.name not in _REQUIRED, strip=False) for f in FUND_SCHEMA]
+
+
+def _normalize_units(values: pa.Array, raw_units: pa.Array):
+    """Scale values and relabel units once per distinct unit instead of per fact."""
+    distinct = pc.unique(raw_units)
+    factors, labels = zip(*(unit_factor(u) for u in distinct.to_pylist())) if len(distinct) else ((), ())
+    pos = pc.index_in(raw_units, value_set=distinct)
+    scale = pc.take(pa.array(factors, pa.float64()), pos)
+    units = pc.take(pa.array(labels, pa.string()), pos)
+    return pc.multiply(values, scale), units
+
+
+def _lookup_filing_dates(accns: pa.Array, filing_dates) -> pa.Array:
+    """Filing date per row from the submissions index (null where unknown)."""
+    distinct = pc.unique(accns)
+    found = filing_dates.lookup(distinct.to_pylist())
+    dates = pa.array([found.get(a) for a in distinct.to_pylist()], pa.date32())
+    return pc.take(dates, pc.index_in(accns, value_set=distinct))
+
+
+def extract_batch_from_json(cik: int, buf_or_obj, source_file: str, TAG_MAP, filing_dates=None) -> pa.RecordBatch:
+    """
+    Columnar twin of extract_rows_from_json: facts are appended into one list
+    per column and turned into a RecordBatch matching FUND_SCHEMA. Unit
+    normalization and the null filing_date filter run on whole columns.
+    """
+    us_gaap = load_us_gaap(buf_or_obj, TAG_MAP)
+    if us_gaap is None:
+        return pa.RecordBatch.from_pylist([], schema=FUND_SCHEMA)
+
+    accns: List = []
+    fys: List = []
+    fps: List = []
+    tags: List = []
+    vals: List = []
+    units: List = []
+    frames: List = []
+    ends: List = []
+
+    for canon, candidates in TAG_MAP.items():
+        tag_payload = None
+        tag_found = None
+        for t in candidates:
+            tp = us_gaap.get(t)
+            if isinstance(tp, dict):
+                tag_payload = tp
+                tag_found = t
+                break
+        if not tag_payload:
+            continue
+
+        tag_units = tag_payload.get("units", {})
+        if not isinstance(tag_units, dict):
+            continue
+
+        for unit, entries in tag_units.items():
+            if not isinstance(entries, list):
+                continue
+            unit = unit if isinstance(unit, str) else str(unit)
+            for e in entries:
+                if not isinstance(e, dict):
+                    continue
+                accn = e.get("accn")
+                if not accn:
+                    continue
+                try:
+                    val = float(e.get("val"))
+                except Exception:
+                    continue
+                end_date = e.get("end")
+                accns.append(accn)
+                fys.append(e.get("fy"))
+                fps.append(e.get("fp"))
+                tags.append(tag_found)
+                vals.append(val)
+                units.append(unit)
+                frames.append(e.get("frame"))
+                ends.append(end_date if isinstance(end_date, str) else None)
+
+    n = len(accns)
+    accn_arr = pa.array(accns, pa.string())
+    values, unit_norm = _normalize_units(pa.array(vals, pa.float64()), pa.array(units, pa.string()))
+    filing_date = pc.cast(
+        pc.strptime(pc.utf8_slice_codeunits(pa.array(ends, pa.string()), 0, 10),
+                    format="%Y-%m-%d", unit="s", error_is_null=True),
+        pa.date32(),
+    )
+    if filing_dates is not None and n:
+        filing_date = pc.coalesce(_lookup_filing_dates(accn_arr, filing_dates), filing_date)
+    batch = pa.RecordBatch.from_arrays([
+        pa.repeat(pa.scalar(cik, pa.int64()), n),
+        accn_arr,
+        pa.array(fys, pa.int32()),
+        pa.array(fps, pa.string()),
+        pa.array(tags, pa.string()),
+        values,
+        unit_norm,
+        pa.array(frames, pa.string()),
+        filing_date,
+        pa.repeat(pa.scalar(source_file, pa.string()), n),
+    ], schema=FUND_SCHEMA)
+    batch, _ = coerce(batch, FUND_COLUMNS)
+    return batch
+
+
+def dedupe_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Columnar twin of json.dedupe_rows: first row per (accession_no, tag, frame)."""
+    if batch.num_rows < 2:
+        return batch
+    keys = pa.table({
+        "a": batch.column("accession_no"),
+        "t": batch.column("tag"),
+        "f": pc.coalesce(batch.column("frame"), pa.scalar(NO_FRAME)),
+        "i": pa.array(range(batch.num_rows), pa.int64()),
+    })
+    first = keys.group_by(["a", "t", "f"], use_threads=False).aggregate([("i", "min")])
+    if first.num_rows == batch.num_rows:
+        return batch
+    idx = first.column("i_min").combine_chunks()
+    return batch.take(pc.take(idx, pc.sort_indices(idx)))
+
+
+class ParquetSink:
+    """Append extracted batches to one Parquet file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def write(self, table: pa.Table | pa.RecordBatch):
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, FUND_SCHEMA)
+        if isinstance(table, pa.RecordBatch):
+            self._writer.write_batch(table)
+        else:
+            self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def concat_batches(batches: Iterable[pa.RecordBatch]) -> pa.Table:
+    return pa.Table.from_batches(list(batches), schema=FUND_SCHEMA)
@@ -6,15 +6,45 @@ from typing import Dict, List
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL", "") 
 SEC_DL_DIR = os.getenv("SEC_DL_DIR", "data/fundamentals/")
+# accession_no -> filing date index built from submissions.zip, kept between runs
+FILING_INDEX_DIR = os.getenv("FILING_INDEX_DIR", os.path.join(SEC_DL_DIR, "filing_index"))
+# companyfacts central directory as of the last fully successful load
+CD_SNAPSHOT_PATH = os.getenv("CD_SNAPSHOT_PATH", os.path.join(SEC_DL_DIR, "companyfacts_cd.parquet"))
 
 
 # Tune this based on RAM and DB throughput
 CHUNK_ROWS = 100_000
 
+# Parallel parse of companyfacts members. 1 keeps everything in-process.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "1"))
+# Members queued per worker; bounds how many parsed docs can sit in memory
+PARSE_PREFETCH = 2
+# Chunks allowed to wait for the staging writer thread before parsing blocks.
+# 1 = double buffering (one chunk writing, one queued, one filling).
+WRITE_QUEUE_DEPTH = int(os.getenv("WRITE_QUEUE_DEPTH", "1"))
+
 FUND_COLS = [
     "cik", "accession_no", "fiscal_year", "fiscal_period",
     "tag", "value", "unit", "frame", "filing_date", "source_file"
 ]
+# frame stand-in for the fundamentals_raw key; matches COALESCE in UPSERT_FROM_STAGING
+NO_FRAME = "__NOFRAME__"
+# Postgres types for FUND_COLS, used by the binary COPY into staging
+FUND_COL_TYPES = [
+    "int8", "text", "int4", "text",
+    "text", "float8", "text", "text", "date", "text"
+]
+
+# "binary" streams typed rows with write_row; "csv" is the older text path
+COPY_FORMAT = os.getenv("COPY_FORMAT", "binary")
+
+# Per-session staging table: "temp" (dropped with the connection) or "unlogged"
+STAGING_KIND = os.getenv("STAGING_KIND", "temp")
+# Build a key index on staging before each merge
+STAGING_INDEX = os.getenv("STAGING_INDEX", "0") == "1"
+
+# Connections the merge is spread over, partitioned by CIK hash
+WRITE_SHARDS = int(os.getenv("WRITE_SHARDS", "1"))
 
 # Canonical metrics we care about and acceptable tag synonyms.
 TAG_MAP: Dict[str, List[str]] = {
@@ -4,12 +4,14 @@ import os
 import sys
 import io
 import json
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, List, Tuple
 from pathlib import Path
 from datetime import datetime
 import orjson as jsonlib
 import tempfile
 import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
 
@@ -20,6 +22,8 @@ from dotenv import load_dotenv
 import os
 from typing import cast
 from etl.sql_scripts.fundamentals import *
+from etl.scripts.utilities.zip import MappedZip
+from etl.scripts.utilities.http import HttpClient, backoff_delay, get_client
 
 load_dotenv()
 
@@ -39,78 +43,216 @@ def jloads(b: bytes):
 
 CHUNK = 1024 * 1024  # 1 MiB
 
-def _head(url):
-    r = requests.head(url, headers=SEC_HEADERS, allow_redirects=True, timeout=30)
-    r.raise_for_status()
-    return r.headers
+# Range segments per download and connections fetching them (1 = single stream)
+DL_SEGMENTS = int(os.getenv("DL_SEGMENTS", "8"))
+DL_CONNECTIONS = int(os.getenv("DL_CONNECTIONS", "4"))
+# Also inflate + CRC every member after download (slow on companyfacts; the
+# structural check already catches truncation)
+DL_VERIFY_CRC = os.getenv("DL_VERIFY_CRC", "0") == "1"
 
-def _get_etag_or_mtime(headers):
-    return headers.get("ETag") or headers.get("Last-Modified") or headers.get("Content-Length")
 
-def _resume_range(path):
-    return os.path.getsize(path) if os.path.exists(path) else 0
 
-def download_zip(url: str, dest_path: str, max_retries: int = 5, sleep_s: float = 2.0) -> str:
+def _read_manifest(path: str) -> dict:
+    try:
+        with open(path, "rb") as f:
+            return jsonlib.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(path: str, manifest: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(jsonlib.dumps(manifest, option=jsonlib.OPT_INDENT_2))
+    os.replace(tmp, path)
+
+
+def verify_zip(path: str, size: int | None = None, deep: bool = DL_VERIFY_CRC):
+    """Raise unless path is a complete zip archive (and of `size` bytes, if given)."""
+    actual = os.path.getsize(path)
+    if size is not None and actual != size:
+        raise zipfile.BadZipFile(f"{path}: {actual} bytes, expected {size}")
+    if actual == 0:
+        raise zipfile.BadZipFile(f"{path} is empty")
+    with MappedZip(path) as zf:
+        zf.check(deep=deep)
+
+
+def _segments(size: int, n: int) -> List[Tuple[int, int]]:
+    """Inclusive byte ranges splitting `size` bytes into at most n parts."""
+    step = max(CHUNK, -(-size // max(1, n)))
+    return [(a, min(a + step, size) - 1) for a in range(0, size, step)]
+
+
+def _load_progress(path: str, size: int, stamp) -> set:
+    try:
+        with open(path, "rb") as f:
+            p = jsonlib.loads(f.read())
+    except (OSError, ValueError):
+        return set()
+    if p.get("size") != size or p.get("stamp") != str(stamp):
+        return set()  # remote file changed under us; start over
+    return set(p.get("done", []))
+
+
+def download_segmented(url: str,
+                       dest_path: str,
+                       size: int,
+                       stamp=None,
+                       segments: int = DL_SEGMENTS,
+                       connections: int = DL_CONNECTIONS,
+                       client: HttpClient | None = None,
+                       headers: Dict[str, str] = SEC_HEADERS,
+                       max_retries: int = 5,
+                       sleep_s: float = 2.0,
+                       verify: Callable[[str], None] | None = None) -> str:
     """
-    Resumable download to dest_path. Writes to dest_path + ".part" then atomically renames.
-    Returns dest_path.
+    Fetch url as `segments` HTTP Range requests over a pool of `connections`
+    keep-alive sessions, writing each part at its offset in a preallocated
+    dest_path + ".part". Finished segments are recorded in ".part.json", so
+    an interrupted download only refetches the parts it didn't finish.
+    Requests share the pooled, per-host rate-limited HttpClient. `verify(path)` runs on the
+    finished .part before it is renamed into place.
     """
+    client = client or get_client()
     tmp = dest_path + ".part"
+    progress_path = tmp + ".json"
+    parts = _segments(size, segments)
+    done = _load_progress(progress_path, size, stamp) if os.path.exists(tmp) else set()
+    if not done or os.path.getsize(tmp) != size:
+        done = set()
+        with open(tmp, "wb") as f:
+            f.truncate(size)
+
+    lock = threading.Lock()
+    # identity encoding so byte offsets match the file, not a gzip stream
+    seg_headers = {**headers, "Accept-Encoding": "identity"}
+
+    def save_progress():
+        with open(progress_path, "wb") as f:
+            f.write(jsonlib.dumps({"size": size, "stamp": str(stamp), "done": sorted(done)}))
+
+    def fetch(i: int):
+        start, end = parts[i]
+        for attempt in range(1, max_retries + 1):
+            try:
+                h = {**seg_headers, "Range": f"bytes={start}-{end}"}
+                with client.get(url, headers=h, stream=True, retries=0) as r:
+                    if r.status_code != 206:
+                        raise IOError(f"segment {i}: expected 206, got {r.status_code}")
+                    pos = start
+                    with open(tmp, "r+b") as f:
+                        f.seek(start)
+                        for chunk in r.iter_content(chunk_size=CHUNK):
+                            f.write(chunk)
+                            pos += len(chunk)
+                    if pos != end + 1:
+                        raise IOError(f"segment {i}: short read ({pos - start} of {end - start + 1} bytes)")
+                with lock:
+                    done.add(i)
+                    save_progress()
+                return
+            except Exception:
+                if attempt == max_retries:
+                    raise
+                time.sleep(backoff_delay(attempt, sleep_s))
+
+    todo = [i for i in range(len(parts)) if i not in done]
+    with ThreadPoolExecutor(max_workers=max(1, min(connections, len(todo) or 1))) as pool:
+        for fut in [pool.submit(fetch, i) for i in todo]:
+            fut.result()
+
+    os.remove(progress_path)
+    _verified_replace(tmp, dest_path, verify)
+    return dest_path
+
+
+def _verified_replace(tmp: str, dest_path: str, verify: Callable[[str], None] | None):
+    if verify is not None:
+        try:
+            verify(tmp)
+        except Exception:
+            os.remove(tmp)  # don't resume from bytes we know are bad
+            raise
+    os.replace(tmp, dest_path)
+
+
+def download_zip(url: str, dest_path: str, max_retries: int = 5, sleep_s: float = 2.0,
+                 segments: int = DL_SEGMENTS, client: HttpClient | None = None) -> str:
+    """
+    Download url to dest_path unless it changed since the last download.
+
+    One conditional GET (If-None-Match / If-Modified-Since from the
+    dest_path + ".json" manifest) doubles as the probe: 304 means we're
+    done, and so does a 200/206 carrying the manifest's ETag, Last-Modified
+    and size (a server ignoring the conditional headers). Otherwise the new
+    file goes to dest_path + ".part", in parallel Range segments when the
+    server allows it, and is only renamed into place after its size and zip
+    structure check out. Returns dest_path.
+    """
+    client = client or get_client()
+    tmp = dest_path + ".part"
+    manifest_path = dest_path + ".json"
     os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
 
+    prior = _read_manifest(manifest_path) if os.path.exists(dest_path) else {}
+    headers = {**SEC_HEADERS, "Accept-Encoding": "identity", "Range": "bytes=0-"}
+    if prior.get("etag"):
+        headers["If-None-Match"] = prior["etag"]
+    if prior.get("last_modified"):
+        headers["If-Modified-Since"] = prior["last_modified"]
 
-    # check if file exists and if its new, add etag stamp to test
-    hdr = _head(url)
-    stamp = _get_etag_or_mtime(hdr)
-    stamp_path = dest_path + '.stamp'
-    if os.path.exists(dest_path) and os.path.exists(stamp_path):
-        with open(stamp_path, 'r') as f:
-            if f.read().strip() == str(stamp):
-                return dest_path # up to date
-            
-    
-    # resumable get download
-    offset = _resume_range(tmp)
-    headers = dict(SEC_HEADERS)
-    if offset > 0:
-        headers['Range'] = f'bytes={offset}-'
-
-    
     for attempt in range(1, max_retries + 1):
         try:
-            with requests.get(url, headers=headers, stream=True, timeout=60) as r:
-                if r.status_code in (206, 200):
-                    mode = 'ab' if r.status_code == 200 and offset > 0 else 'wb'
-                    if mode =='wb' and os.path.exists(tmp):
-                        os.remove(tmp)
-                    with open(tmp, mode) as f:
-                        for chunk in r.iter_content(chunk_size=CHUNK):
-                            if chunk:
-                                f.write(chunk)
-                    
-                    # done update
-                    if os.path.exists(dest_path):
-                        os.remove(dest_path)
-                    os.rename(tmp, dest_path)
-                    with open(stamp_path, 'w') as s:
-                        s.write(str(stamp))
-                    return dest_path
-                
-                elif r.status_code == 416:
-                    # Range not satisfiable: probably already complete. Rename and move on.
-                    if os.path.exists(tmp):
-                        if os.path.exists(dest_path):
-                            os.remove(dest_path)
-                        os.rename(tmp, dest_path)
-                    with open(stamp_path, "w") as s:
-                        s.write(str(stamp))
+            with client.get(url, headers=headers, stream=True, retries=0) as r:
+                if r.status_code == 304:
+                    return dest_path  # up to date
+
+                if r.status_code not in (200, 206):
+                    r.raise_for_status()
+                    raise IOError(f"unexpected status {r.status_code}")
+
+                etag = r.headers.get("ETag")
+                last_modified = r.headers.get("Last-Modified")
+                if r.status_code == 206:
+                    size = int(r.headers["Content-Range"].rsplit("/", 1)[1])
+                else:
+                    size = int(r.headers.get("Content-Length") or 0) or None
+                if (prior and (etag or last_modified) and os.path.getsize(dest_path) == prior.get("size")
+                        and (etag, last_modified, size) == (prior.get("etag"), prior.get("last_modified"),
+                                                             prior.get("size"))):
+                    # server ignored the conditional headers, but it's the same file
                     return dest_path
+                verify = lambda p: verify_zip(p, size)
+
+                if r.status_code == 206:
+                    # server takes ranges: drop the probe and fetch in segments
+                    r.close()
+                    download_segmented(url, dest_path, size, stamp=etag or last_modified,
+                                       segments=max(1, segments), max_retries=max_retries,
+                                       sleep_s=sleep_s, verify=verify, client=client)
                 else:
-                    r.raise_for_status()
+                    with open(tmp, "wb") as f:
+                        for chunk in r.iter_content(chunk_size=CHUNK):
+                            f.write(chunk)
+                    _verified_replace(tmp, dest_path, verify)
+
+            _write_manifest(manifest_path, {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "size": os.path.getsize(dest_path),
+                "verified": "crc" if DL_VERIFY_CRC else "structure",
+                "fetched_at": datetime.now().isoformat(timespec="seconds"),
+            })
+            legacy_stamp = dest_path + ".stamp"
+            if os.path.exists(legacy_stamp):
+                os.remove(legacy_stamp)
+            return dest_path
         except Exception as e:
             if attempt == max_retries:
                 raise
-            time.sleep(sleep_s * attempt)  # simple backoff
+            time.sleep(backoff_delay(attempt, sleep_s))
 
     return dest_path
 
@@ -119,19 +261,24 @@ def download_zip(url: str, dest_path: str, max_retries: int = 5, sleep_s: float
 
 
 
-def getSECZips():
-    COMPANYFACTS = "https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip"
-    SUBMISSIONS  = "https://www.sec.gov/Archives/edgar/daily-index/bulkdata/submissions.zip"
+COMPANYFACTS_URL = "https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip"
+SUBMISSIONS_URL = "https://www.sec.gov/Archives/edgar/daily-index/bulkdata/submissions.zip"
+
+
+def sec_zip_path(filename: str) -> str:
+    return os.path.join(os.getenv("SEC_DL_DIR", "data/sec"), filename)
 
-    dl_dir = os.getenv("SEC_DL_DIR", "data/sec")
-    cf_path = os.path.join(dl_dir, "companyfacts.zip")
-    sub_path = os.path.join(dl_dir, "submissions.zip")
+
+def getSECZips():
+    cf_path = sec_zip_path("companyfacts.zip")
+    sub_path = sec_zip_path("submissions.zip")
 
     print("Downloading companyfacts...")
-    download_zip(COMPANYFACTS, cf_path)
+    download_zip(COMPANYFACTS_URL, cf_path)
     print("Downloading submissions...")
-    download_zip(SUBMISSIONS,  sub_path)
+    download_zip(SUBMISSIONS_URL,  sub_path)
     print('finished downloading')
+    print(get_client().report())
 
     return {
         'status' : 200,
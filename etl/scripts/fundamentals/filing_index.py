@@ -0,0 +1,191 @@
+import os
+import zipfile
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import orjson as jsonlib
+
+from etl.scripts.utilities.zip import open_zip
+
+
+# accession_no "0000320193-23-000106" packs into 18 digits, which fits int64;
+# filing dates are stored as int32 days since 1970-01-01
+_EPOCH_ORD = date(1970, 1, 1).toordinal()
+
+_ACCN_FILE = "accn.npy"
+_DATE_FILE = "date.npy"
+_MEMBER_FILE = "member.npy"
+_MANIFEST_FILE = "manifest.json"
+
+
+def accn_to_int(accn: str) -> Optional[int]:
+    try:
+        return int(accn.replace("-", ""))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _day(s: str) -> Optional[int]:
+    try:
+        return date.fromisoformat(s[:10]).toordinal() - _EPOCH_ORD
+    except (TypeError, ValueError):
+        return None
+
+
+def _member_filings(raw: bytes) -> Tuple[List[int], List[int]]:
+    """
+    (accessions, days) from one submissions member. CIK##########.json keeps
+    the recent filings under filings.recent; the overflow pages
+    (CIK##########-submissions-001.json, ...) hold the same arrays at the top.
+    """
+    j = jsonlib.loads(raw)
+    block = j.get("filings", {}).get("recent") if "filings" in j else j
+    if not isinstance(block, dict):
+        return [], []
+    accns, days = [], []
+    for a, d in zip(block.get("accessionNumber") or [], block.get("filingDate") or []):
+        ai, di = accn_to_int(a), _day(d)
+        if ai is not None and di is not None:
+            accns.append(ai)
+            days.append(di)
+    return accns, days
+
+
+class FilingIndex:
+    """
+    accession_no -> filing date, held as two sorted parallel arrays on disk.
+    Opened with mmap, so worker processes share the OS page cache instead of
+    each holding a copy, and lookups are a binary search.
+    """
+
+    def __init__(self, accn: np.ndarray, day: np.ndarray):
+        self.accn = accn
+        self.day = day
+
+    def __len__(self):
+        return len(self.accn)
+
+    @classmethod
+    def open(cls, index_dir: str) -> Optional["FilingIndex"]:
+        path = os.path.join(index_dir, _ACCN_FILE)
+        if not os.path.exists(path):
+            return None
+        return cls(np.load(path, mmap_mode="r"),
+                   np.load(os.path.join(index_dir, _DATE_FILE), mmap_mode="r"))
+
+    def lookup(self, accns: Iterable[str]) -> Dict[str, date]:
+        """Filing dates for the accessions that are in the index."""
+        keys = [(a, accn_to_int(a)) for a in set(accns)]
+        keys = [(a, k) for a, k in keys if k is not None]
+        if not keys or not len(self.accn):
+            return {}
+        q = np.fromiter((k for _, k in keys), dtype=np.int64, count=len(keys))
+        pos = np.minimum(np.searchsorted(self.accn, q), len(self.accn) - 1)
+        hit = self.accn[pos] == q
+        days = self.day[pos]
+        return {
+            a: date.fromordinal(_EPOCH_ORD + int(days[i]))
+            for i, (a, _) in enumerate(keys) if hit[i]
+        }
+
+
+def _save(index_dir: str, accn: np.ndarray, day: np.ndarray, member: np.ndarray, manifest: dict):
+    # write everything next to the live files, then swap them in
+    os.makedirs(index_dir, exist_ok=True)
+    for fname, arr in ((_ACCN_FILE, accn), (_DATE_FILE, day), (_MEMBER_FILE, member)):
+        tmp = os.path.join(index_dir, fname + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, os.path.join(index_dir, fname))
+    tmp = os.path.join(index_dir, _MANIFEST_FILE + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(jsonlib.dumps(manifest))
+    os.replace(tmp, os.path.join(index_dir, _MANIFEST_FILE))
+
+
+def _valid_manifest(manifest) -> bool:
+    # {"next_id": int, "members": {name: [id, crc, size]}} with every id below next_id
+    next_id = manifest["next_id"]
+    members = manifest["members"]
+    if not isinstance(next_id, int) or not isinstance(members, dict):
+        return False
+    return all(isinstance(v, list) and len(v) == 3 and all(isinstance(x, int) for x in v)
+               and 0 <= v[0] < next_id for v in members.values())
+
+
+def _load_existing(index_dir: str):
+    """The saved index, or None (full rebuild) if any part is missing or inconsistent."""
+    try:
+        with open(os.path.join(index_dir, _MANIFEST_FILE), "rb") as f:
+            manifest = jsonlib.loads(f.read())
+        accn = np.load(os.path.join(index_dir, _ACCN_FILE))
+        day = np.load(os.path.join(index_dir, _DATE_FILE))
+        member = np.load(os.path.join(index_dir, _MEMBER_FILE))
+        if not _valid_manifest(manifest):
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if not (accn.ndim == day.ndim == member.ndim == 1 and len(accn) == len(day) == len(member)):
+        return None
+    return manifest, accn, day, member
+
+
+def build_filing_index(submissions_zip: str, index_dir: str) -> FilingIndex:
+    """
+    Build or refresh the index from submissions.zip. The manifest records each
+    member's CRC and size plus an id stamped on every entry it contributed,
+    so a rerun only re-reads members that were added or changed and drops
+    the entries of members that changed or disappeared.
+    """
+    existing = _load_existing(index_dir)
+    if existing is None:
+        manifest = {"next_id": 0, "members": {}}
+        accn = np.empty(0, np.int64)
+        day = np.empty(0, np.int32)
+        member = np.empty(0, np.int32)
+    else:
+        manifest, accn, day, member = existing
+
+    old_members: Dict[str, list] = manifest["members"]
+    new_members: Dict[str, list] = {}
+    next_id = manifest["next_id"]
+    add_accn: List[np.ndarray] = []
+    add_day: List[np.ndarray] = []
+    add_member: List[np.ndarray] = []
+    reread = 0
+
+    with open_zip(submissions_zip) as zf:
+        for zi in zf.infolist():
+            name = zi.filename
+            if not name.endswith(".json"):
+                continue
+            prior = old_members.get(name)
+            if prior is not None and prior[1] == zi.CRC and prior[2] == zi.file_size:
+                new_members[name] = prior
+                continue
+            with zf.open(zi) as fp:
+                a, d = _member_filings(fp.read())
+            mid = next_id
+            next_id += 1
+            new_members[name] = [mid, zi.CRC, zi.file_size]
+            add_accn.append(np.asarray(a, np.int64))
+            add_day.append(np.asarray(d, np.int32))
+            add_member.append(np.full(len(a), mid, np.int32))
+            reread += 1
+
+    live_ids = np.fromiter((v[0] for v in new_members.values()), dtype=np.int32)
+    keep = np.isin(member, live_ids)
+    dropped = len(old_members.keys() - new_members.keys())
+
+    if reread or dropped:
+        accn = np.concatenate([accn[keep]] + add_accn)
+        day = np.concatenate([day[keep]] + add_day)
+        member = np.concatenate([member[keep]] + add_member)
+        order = np.argsort(accn, kind="stable")
+        accn, day, member = accn[order], day[order], member[order]
+        _save(index_dir, accn, day, member, {"next_id": next_id, "members": new_members})
+
+    print(f"Filing index: {len(accn)} accessions | {reread} members read | "
+          f"{len(new_members) - reread} unchanged | {dropped} removed")
+    return FilingIndex.open(index_dir)
@@ -1,32 +1,125 @@
-from typing import List, Tuple
+from datetime import date
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
 import orjson as jsonlib
 from etl.scripts.utilities.normalize import normalize_value_unit
+from etl.scripts.fundamentals.config import FUND_COLS, NO_FRAME
 
-def extract_rows_from_json(cik: int, buf_or_obj, source_file: str, TAG_MAP) -> List[Tuple]:
+_ACCN, _TAG, _FRAME, _FILED = (FUND_COLS.index(c) for c in ("accession_no", "tag", "frame", "filing_date"))
+
+
+@lru_cache(maxsize=8192)
+def _iso_date(s: str) -> date | None:
+    # a few thousand distinct period ends cover every filer, so cache the parse
+    try:
+        return date.fromisoformat(s[:10])
+    except (TypeError, ValueError):
+        return None
+
+# Tag set per TAG_MAP, keyed by id() so repeated calls don't rebuild it
+_WANTED_CACHE: Dict[int, Tuple[Dict, FrozenSet[bytes]]] = {}
+
+def wanted_tags(TAG_MAP) -> FrozenSet[bytes]:
+    """Every candidate tag in TAG_MAP as UTF-8 bytes, for O(1) key checks."""
+    hit = _WANTED_CACHE.get(id(TAG_MAP))
+    if hit is not None and hit[0] is TAG_MAP:
+        return hit[1]
+    wanted = frozenset(t.encode() for candidates in TAG_MAP.values() for t in candidates)
+    _WANTED_CACHE[id(TAG_MAP)] = (TAG_MAP, wanted)
+    return wanted
+
+
+_US_GAAP_OPEN = b'"us-gaap":{'
+_UNITS_KEY = b'"units":'
+_TAG_CLOSE = b']}}'  # last unit array, units object, tag object
+
+def select_us_gaap(buf: bytes, wanted: FrozenSet[bytes]) -> Optional[Dict[str, dict]]:
     """
-    Return rows matching FUND_COLS from one companyfacts JSON, limited to TAG_MAP.
+    Decode only the wanted tag objects under facts.us-gaap.
+
+    Relies on the compact layout SEC ships: every tag is
+    "Tag":{...,"units":{"USD":[{...},...]}} with "units" last. Unwanted tags
+    are skipped by byte search alone. Returns None whenever the bytes don't
+    look like that, and the caller falls back to a full parse.
+    """
+    start = buf.find(_US_GAAP_OPEN)
+    if start < 0:
+        return None
+    pos = start + len(_US_GAAP_OPEN)
+    out: Dict[str, dict] = {}
+    if buf[pos:pos + 1] == b"}":
+        return out
+
+    while True:
+        if buf[pos:pos + 1] != b'"':
+            return None
+        key_end = buf.find(b'"', pos + 1)
+        if key_end < 0 or buf[key_end + 1:key_end + 3] != b":{":
+            return None
+        obj_start = key_end + 2
+        units = buf.find(_UNITS_KEY, obj_start)
+        if units < 0:
+            return None
+        obj_end = buf.find(_TAG_CLOSE, units)
+        if obj_end < 0:
+            return None
+        obj_end += len(_TAG_CLOSE)
+        # a second "units" key means we ran past this tag (e.g. empty units)
+        if buf.find(_UNITS_KEY, units + len(_UNITS_KEY), obj_end) >= 0:
+            return None
+
+        key = buf[pos + 1:key_end]
+        if key in wanted:
+            try:
+                out[key.decode()] = jsonlib.loads(buf[obj_start:obj_end])
+            except Exception:
+                return None
+
+        nxt = buf[obj_end:obj_end + 1]
+        if nxt == b",":
+            pos = obj_end + 1
+        elif nxt == b"}":
+            return out
+        else:
+            return None
+
+
+def load_us_gaap(buf_or_obj, TAG_MAP) -> Optional[Dict[str, dict]]:
+    """
+    Return the facts.us-gaap mapping (at least every TAG_MAP tag present), or
+    None if the document is unusable. Raw bytes go through select_us_gaap first.
     """
     if isinstance(buf_or_obj, (bytes, bytearray)):
+        us_gaap = select_us_gaap(bytes(buf_or_obj), wanted_tags(TAG_MAP))
+        if us_gaap is not None:
+            return us_gaap
         try:
             j = jsonlib.loads(buf_or_obj)
         except Exception:
-            return []
+            return None
     elif isinstance(buf_or_obj, dict):
         j = buf_or_obj
     else:
-        return []
+        return None
 
-    facts = j.get("facts", {})
+    facts = j.get("facts", {}) if isinstance(j, dict) else None
     if not isinstance(facts, dict):
-        return []
-
-    # crude filing_date derivation: try "entity.commonStockSharesOutstanding" frames' 'end' or fall back to submissions logic later
-    filing_date_guess = None
-    # if available in companyfacts root, use "entity.commonStockSharesOutstanding" erg... not consistent.
-    # We'll default to None and allow NULL filtering later if needed; better: you can pass in a mapping from submissions.
-
+        return None
     us_gaap = facts.get("us-gaap", {})
     if not isinstance(us_gaap, dict):
+        return None
+    return us_gaap
+
+
+def extract_rows_from_json(cik: int, buf_or_obj, source_file: str, TAG_MAP, filing_dates=None) -> List[Tuple]:
+    """
+    Return rows matching FUND_COLS from one companyfacts JSON, limited to TAG_MAP.
+
+    filing_dates (a FilingIndex) supplies real filing dates by accession;
+    facts it doesn't know keep their period end date as the proxy.
+    """
+    us_gaap = load_us_gaap(buf_or_obj, TAG_MAP)
+    if us_gaap is None:
         return []
 
     rows: List[Tuple] = []
@@ -58,14 +151,10 @@ def extract_rows_from_json(cik: int, buf_or_obj, source_file: str, TAG_MAP) -> L
                 fy = e.get("fy")
                 fp = e.get("fp")
                 frame = e.get("frame")
-                # many entries also have 'end' (ISO date). Use that as filing_date proxy.
+                # many entries also have 'end' (ISO date). Use that as filing_date proxy
+                # until the submissions index below replaces it.
                 end_date = e.get("end")
-                filing_date = None
-                if end_date:
-                    try:
-                        filing_date = end_date[:10]  # YYYY-MM-DD
-                    except Exception:
-                        filing_date = None
+                filing_date = _iso_date(end_date) if isinstance(end_date, str) else None
 
                 if not accn:
                     continue
@@ -79,4 +168,29 @@ def extract_rows_from_json(cik: int, buf_or_obj, source_file: str, TAG_MAP) -> L
                     filing_date,  # may be None; DB column is DATE, NULL allowed in staging, not in raw
                     source_file
                 ))
-    return rows
\ No newline at end of file
+
+    if filing_dates is not None and rows:
+        found = filing_dates.lookup(r[_ACCN] for r in rows)
+        if found:
+            rows = [
+                r if (d := found.get(r[_ACCN])) is None else r[:_FILED] + (d,) + r[_FILED + 1:]
+                for r in rows
+            ]
+    return rows
+
+
+def dedupe_rows(rows: List[Tuple]) -> List[Tuple]:
+    """
+    Keep the first row per fundamentals_raw key. A companyfacts document
+    repeats a fact for every later filing that restates it, and all but one
+    copy would be thrown away by ON CONFLICT DO NOTHING anyway. cik is
+    constant within a document so it's left out of the key.
+    """
+    seen = set()
+    out = []
+    for r in rows:
+        k = (r[_ACCN], r[_TAG], NO_FRAME if r[_FRAME] is None else r[_FRAME])
+        if k not in seen:
+            seen.add(k)
+            out.append(r)
+    return out
@@ -4,7 +4,14 @@ import psycopg
 from psycopg import sql
 import zipfile
 from psycopg.rows import tuple_row
-from etl.sql_scripts.fundamentals import LEDGER_SELECT, LEDGER_UPSERT
+from etl.sql_scripts.fundamentals import (
+    LEDGER_SELECT, LEDGER_UPSERT,
+    LEDGER_BATCH_DDL, LEDGER_BATCH_COPY, LEDGER_BATCH_CLEAR, LEDGER_BATCH_ANALYZE,
+    LEDGER_BATCH_SELECT, LEDGER_BATCH_CHANGED, LEDGER_BATCH_RESUMED, LEDGER_BATCH_UPSERT,
+)
+
+LEDGER_COLS = ["source_kind","natural_key","asset_path","byte_size","crc32","sha256","last_modified","etag","processed_at","status"]
+LEDGER_BATCH_TYPES = ["text", "text", "int8", "int8", "text", "timestamptz", "text"]
 
 
 def zip_member_meta(zf: zipfile.ZipFile, name: str) -> Dict[str, Any]:
@@ -16,7 +23,7 @@ def zip_member_meta(zf: zipfile.ZipFile, name: str) -> Dict[str, Any]:
         "asset_path": name,
         "byte_size": zi.file_size,
         "crc32": zi.CRC,
-        "sha256": None,     # skip hashing the whole blob; CRC+size is plenty for this
+        "sha256": None,     # fingerprint of the extracted rows, filled in after parsing
         "last_modified": last_modified,
         "etag": None,
     }
@@ -27,8 +34,7 @@ def ledger_get(conn: psycopg.Connection, source_kind: str, natural_key: str) ->
         row = cur.fetchone()
     if not row:
         return None
-    cols = ["source_kind","natural_key","asset_path","byte_size","crc32","sha256","last_modified","etag","processed_at","status"]
-    return dict(zip(cols, row))
+    return dict(zip(LEDGER_COLS, row))
 
 def ledger_upsert(conn: psycopg.Connection, source_kind: str, natural_key: str, meta: Dict[str, Any], status: str):
     with conn.cursor() as cur:
@@ -56,42 +62,66 @@ def should_parse(current: Dict[str, Any], prior: Optional[Dict[str, Any]]) -> bo
     return any(current.get(k) != prior.get(k) for k in keys)
 
 
+def _load_ledger_batch(cur: psycopg.Cursor, metas: list[dict]):
+    """Replace the contents of this connection's _ledger_batch temp table with metas."""
+    cur.execute(LEDGER_BATCH_DDL)
+    cur.execute(LEDGER_BATCH_CLEAR)
+    with cur.copy(LEDGER_BATCH_COPY) as cp:
+        cp.set_types(LEDGER_BATCH_TYPES)
+        for m in metas:
+            cp.write_row((
+                m["natural_key"],
+                m.get("asset_path"),
+                m.get("byte_size"),
+                m.get("crc32"),
+                m.get("sha256"),
+                m.get("last_modified"),
+                m.get("etag"),
+            ))
+    cur.execute(LEDGER_BATCH_ANALYZE)
+
+
 def ledger_bulk_get(conn: psycopg.Connection, source_kind: str, natural_keys: list[str]) -> dict[str, dict]:
     if not natural_keys:
         return {}
-    placeholders = sql.SQL(",").join(sql.Literal(k) for k in natural_keys)
-    q = sql.SQL("""
-        SELECT source_kind, natural_key, asset_path, byte_size, crc32, sha256, last_modified, etag, processed_at, status
-        FROM etl_source_ledger
-        WHERE source_kind = {sk} AND natural_key IN ({keys})
-    """).format(sk=sql.Literal(source_kind), keys=placeholders)
     out = {}
     with conn.cursor(row_factory=tuple_row) as cur:
-        cur.execute(q)
-        cols = ["source_kind","natural_key","asset_path","byte_size","crc32","sha256","last_modified","etag","processed_at","status"]
+        _load_ledger_batch(cur, [{"natural_key": k} for k in natural_keys])
+        cur.execute(LEDGER_BATCH_SELECT, {"source_kind": source_kind})
         for row in cur.fetchall():
-            d = dict(zip(cols, row))
+            d = dict(zip(LEDGER_COLS, row))
             out[d["natural_key"]] = d
+    conn.commit()
     return out
 
+def ledger_bulk_diff(conn: psycopg.Connection,
+                     source_kind: str,
+                     metas: list[dict],
+                     since: Optional[datetime] = None) -> tuple[list[dict], dict[str, Optional[str]], int]:
+    """
+    Compare metas against the ledger in one COPY + join.
+
+    Returns (changed metas in input order, {natural_key: prior sha256} for
+    those, count of unchanged metas last processed after `since`).
+    """
+    if not metas:
+        return [], {}, 0
+    with conn.cursor(row_factory=tuple_row) as cur:
+        _load_ledger_batch(cur, metas)
+        params = {"source_kind": source_kind, "since": since}
+        cur.execute(LEDGER_BATCH_CHANGED, params)
+        prior_sha = {k: sha for k, sha in cur.fetchall()}
+        cur.execute(LEDGER_BATCH_RESUMED, params)
+        row = cur.fetchone()
+        resumed = int(row[0]) if row else 0
+    conn.commit()
+    changed = [m for m in metas if m["natural_key"] in prior_sha]
+    return changed, prior_sha, resumed
+
 def ledger_bulk_upsert(conn: psycopg.Connection, source_kind: str, metas: list[dict], status: str):
+    """COPY metas into the temp batch and upsert them with one INSERT ... SELECT. Does not commit."""
     if not metas:
         return
     with conn.cursor() as cur:
-        cur.executemany(
-            LEDGER_UPSERT,
-            [
-                (
-                    source_kind,
-                    m["natural_key"],
-                    m["asset_path"],
-                    m["byte_size"],
-                    m["crc32"],     # BIGINT now, right?
-                    m.get("sha256"),
-                    m["last_modified"],
-                    m.get("etag"),
-                    status,
-                )
-                for m in metas
-            ]
-        )
\ No newline at end of file
+        _load_ledger_batch(cur, metas)
+        cur.execute(LEDGER_BATCH_UPSERT, {"source_kind": source_kind, "status": status})
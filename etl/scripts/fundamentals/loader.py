@@ -1,68 +1,63 @@
 import os
-import csv
+import argparse
 import time
 import tempfile
+import threading
 from typing import Dict, List, Tuple, Iterable
-from io import StringIO, BytesIO
 import pandas as pd
+import pyarrow as pa
 import psycopg
-from psycopg import sql
 from psycopg.rows import tuple_row
 
-from etl.scripts.utilities.zip import open_zip
+from etl.scripts.utilities.zip import MappedZip, ZipIndex
 from etl.sql_scripts.fundamentals import *
-from etl.sql_scripts.logs import LOG_UPLOAD_PG
-from etl.scripts.fundamentals.config import FUND_COLS, DATABASE_URL, TAG_MAP, CHUNK_ROWS,SEC_DL_DIR
-from etl.scripts.fundamentals.json import extract_rows_from_json
+from etl.sql_scripts.logs import LOG_UPLOAD_PG, LAST_OK_RUN_PG
+from etl.scripts.fundamentals.config import (
+    FUND_COLS, DATABASE_URL, TAG_MAP, CHUNK_ROWS, SEC_DL_DIR,
+    PARSE_WORKERS, WRITE_QUEUE_DEPTH, COPY_FORMAT, STAGING_KIND, STAGING_INDEX, WRITE_SHARDS,
+    FILING_INDEX_DIR, CD_SNAPSHOT_PATH,
+)
+from etl.scripts.fundamentals.parse_pool import iter_parsed
+from etl.scripts.fundamentals.writer import StageTimings
+from etl.scripts.fundamentals.columnar import ParquetSink
+from etl.scripts.fundamentals.shards import ShardedWriter
+from etl.scripts.fundamentals.filing_index import build_filing_index
+from etl.scripts.fundamentals.snapshot import cd_table, read_snapshot, write_snapshot, diff_snapshot
 from etl.scripts.fundamentals.ledger import *
 
 
 def ensure_tables(conn: psycopg.Connection):
     with conn.cursor() as cur:
         cur.execute(DDL_RAW)
-        cur.execute(DDL_STAGING)
     conn.commit()
 
-
-def copy_rows_to_staging(conn: psycopg.Connection, rows: Iterable[Tuple]):
-    # Build CSV in memory
-    buf = StringIO()
-    writer = csv.writer(buf, lineterminator="\n")
-    writer.writerows(rows)
-    data = buf.getvalue().encode()
-
-    # Compose a typed COPY statement
-    cols = sql.SQL(", ").join(sql.Identifier(c) for c in FUND_COLS)
-    copy_stmt = sql.SQL("COPY staging_fundamentals ({cols}) FROM STDIN WITH (FORMAT csv)").format(
-        cols=cols
-    )
-
-    with conn.cursor() as cur:
-        with cur.copy(copy_stmt) as cp:
-            cp.write(data)
-
-    conn.commit()
-
-
-def upsert_from_staging(conn: psycopg.Connection):
-    with conn.cursor() as cur:
-        cur.execute(UPSERT_FROM_STAGING)
-        cur.execute(TRUNCATE_STAGING)
+def last_ok_run(conn: psycopg.Connection) -> datetime | None:
+    """End time of the last fundamentals run that finished cleanly."""
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(LAST_OK_RUN_PG, {"pipeline_name": "fundamentals_loader"})
+        row = cur.fetchone()
     conn.commit()
+    if not row or row[0] is None:
+        return None
+    # etl_logs stores naive local timestamps (datetime.now())
+    return row[0].astimezone() if row[0].tzinfo is None else row[0]
 
 # -----------------------------
 # ZIP streaming with chunked DB writes
 # -----------------------------
 
-def stream_parse_zip_json(conn: psycopg.Connection, 
-                          zip_path: str, 
-                          valid_ciks: set[int], 
-                          stop_early: int = 0) -> int:
-    source_kind = "companyfacts"
-    # 0) build meta list for all valid CIK members
+def scan_candidates(zip_path: str,
+                    valid_ciks: set[int],
+                    stop_early: int = 0) -> Tuple[List[dict], ZipIndex, List[int]]:
+    """
+    Ledger metas for every CIK member we track, plus the parsed central
+    directory and each meta's position in it. Touches only the local archive.
+    """
     metas = []
-    with open_zip(zip_path) as zf:
-        for name in zf.namelist():
+    positions = []
+    with MappedZip(zip_path) as zf:
+        zip_index = zf.index
+        for i, name in enumerate(zf.namelist()):
             if not name.endswith(".json") or not name.startswith("CIK"):
                 continue
             cik_str = name.split(".")[0][3:]
@@ -72,86 +67,193 @@ def stream_parse_zip_json(conn: psycopg.Connection,
                 continue
             if cik_int not in valid_ciks:
                 continue
-            zi = zf.getinfo(name)
             # zip info → meta
-            lm = datetime(*zi.date_time).replace(tzinfo=timezone.utc)
+            lm = zf.date_time(i).replace(tzinfo=timezone.utc)
             metas.append({
                 "natural_key": cik_str,
                 "asset_path": name,
-                "byte_size": zi.file_size,
-                "crc32": zi.CRC,
+                "byte_size": zf.file_size(i),
+                "crc32": zf.crc(i),
                 "sha256": None,
                 "last_modified": lm,
                 "etag": None,
             })
+            positions.append(i)
             if stop_early and len(metas) >= stop_early:
                 break
+    return metas, zip_index, positions
+
+
+def stream_parse_zip_json(conn: psycopg.Connection, 
+                          zip_path: str, 
+                          valid_ciks: set[int], 
+                          stop_early: int = 0,
+                          workers: int = 1,
+                          queue_depth: int = WRITE_QUEUE_DEPTH,
+                          copy_format: str = COPY_FORMAT,
+                          columnar: bool = False,
+                          parquet_path: str | None = None,
+                          staging_kind: str = STAGING_KIND,
+                          staging_index: bool = STAGING_INDEX,
+                          shards: int = WRITE_SHARDS,
+                          index_dir: str | None = None,
+                          candidates: Tuple[List[dict], ZipIndex] | None = None) -> int:
+    source_kind = "companyfacts"
+    # 0) build meta list for all valid CIK members. The central directory is
+    #    parsed once and handed to the parse pass along with the map.
+    if candidates is None:
+        metas, zip_index, _ = scan_candidates(zip_path, valid_ciks, stop_early)
+    else:
+        metas, zip_index = candidates
 
     if not metas:
         print("No matching CIKs found.")
         return 0
 
-    # 1) one round-trip to fetch prior ledger state
-    prior = ledger_bulk_get(conn, source_kind, [m["natural_key"] for m in metas])
+    # 1) + 2) COPY the candidates into a temp table and let one join against
+    #    the ledger pick out the changed ones. Ledger rows are written per
+    #    chunk, so unchanged CIKs stamped after the last successful run were
+    #    committed by a run that didn't finish ("resumed").
+    changed, prior_sha, resumed = ledger_bulk_diff(conn, source_kind, metas, since=last_ok_run(conn))
+    unchanged = len(metas) - len(changed)
 
-    # 2) decide which changed
-    def is_changed(m, p):
-        if p is None: return True
-        return (
-            m["asset_path"] != p.get("asset_path") or
-            m["byte_size"]  != p.get("byte_size")  or
-            m["crc32"]      != p.get("crc32")      or
-            m["last_modified"] != p.get("last_modified")
-        )
+    print(f"Candidates: {len(metas)} | Changed: {len(changed)} | Unchanged: {unchanged} | Resumed: {resumed}")
 
-    changed = [m for m in metas if is_changed(m, prior.get(m["natural_key"]))]
-    unchanged = len(metas) - len(changed)
+    # 3) parse only changed (optionally across a process pool). Rows are
+    #    routed by CIK hash to `shards` connections; each shard's writer
+    #    thread COPYs + merges its previous chunk while parsing continues.
+    timings = StageTimings()
+    # Parquet copy of what gets staged; only available for Arrow chunks
+    sink = ParquetSink(parquet_path) if (columnar and parquet_path) else None
+    sink_lock = threading.Lock()
 
-    print(f"Candidates: {len(metas)} | Changed: {len(changed)} | Unchanged: {unchanged}")
-
-    # 3) parse only changed; stage + upsert in chunks
-    row_buffer: list[Tuple] = []
-    filing_date_idx = FUND_COLS.index("filing_date")
-
-    with open_zip(zip_path) as zf:
-        for m in changed:
-            name = m["asset_path"]
-            cik_int = int(m["natural_key"])
-            with zf.open(name) as fp:
-                raw = fp.read()
-            rows = extract_rows_from_json(cik_int, raw, source_file=name, TAG_MAP=TAG_MAP)
-            rows = [r for r in rows if r[filing_date_idx] is not None]
-            if rows:
-                row_buffer.extend(rows)
-            if len(row_buffer) >= CHUNK_ROWS:
-                copy_rows_to_staging(conn, row_buffer)
-                upsert_from_staging(conn)
-                row_buffer.clear()
-
-    if row_buffer:
-        copy_rows_to_staging(conn, row_buffer)
-        upsert_from_staging(conn)
-        row_buffer.clear()
-
-    # 4) one batch upsert to ledger for changed only; single commit after
-    ledger_bulk_upsert(conn, source_kind, changed, status="ok")
-    conn.commit()
+    def write_parquet(payload):
+        if isinstance(payload, pa.Table):
+            with sink_lock, timings.timed("parquet"):
+                sink.write(payload)
+
+    same_content = staged_rows = dup_rows = 0
+    conns = [conn] + [psycopg.connect(DATABASE_URL, autocommit=False) for _ in range(shards - 1)]
+    try:
+        with ShardedWriter(conns,
+                           source_kind,
+                           columnar=columnar,
+                           copy_format=copy_format,
+                           staging_kind=staging_kind,
+                           staging_index=staging_index,
+                           queue_depth=queue_depth,
+                           timings=timings,
+                           on_flushed=write_parquet if sink is not None else None) as writer:
+            parsed = iter_parsed(zip_path, changed, workers=workers, columnar=columnar,
+                                 index_dir=index_dir, zip_index=zip_index)
+            while True:
+                with timings.timed("parse"):
+                    item = next(parsed, None)
+                if item is None:
+                    break
+                meta, rows = item
+                # SEC rewrites a member when any fact changes; if the facts we
+                # keep hash the same, only the ledger row needs refreshing
+                if meta["sha256"] == prior_sha.get(meta["natural_key"]):
+                    same_content += 1
+                    writer.add(meta)
+                else:
+                    staged_rows += rows.num_rows if columnar else len(rows)
+                    dup_rows += meta["dup_rows"]
+                    writer.add(meta, rows)
+    finally:
+        if sink is not None:
+            sink.close()
+        for c in conns[1:]:
+            c.close()
+
+    print(timings.report())
+    if dup_rows:
+        # per-row COPY + merge cost of this run applied to the rows we never sent
+        db_s = sum(v for k, v in timings.seconds.items() if k.startswith(("copy", "merge")))
+        per_row = db_s / staged_rows if staged_rows else 0.0
+        print(f"Deduped {dup_rows} repeated facts before staging "
+              f"({dup_rows / (staged_rows + dup_rows):.1%} of extracted rows); "
+              f"~{dup_rows * per_row:.1f}s of COPY + merge avoided")
+
+    # 4) the ledger was written chunk by chunk inside each merge transaction;
+    #    a failed shard's CIKs stay "changed" and are retried next run
+    committed = writer.committed
+
+    if writer.failed:
+        for idx, err in writer.failed:
+            print(f"Shard {idx} failed: {err!r}")
+        raise RuntimeError(f"{len(writer.failed)} of {shards} shard(s) failed; "
+                           f"{len(changed) - len(committed)} CIKs left for the next run")
 
-    print(f"Loaded {len(changed)} changed CIKs; skipped parsing {unchanged}.")
+    print(f"Loaded {len(committed)} changed CIKs ({same_content} with identical extracted facts, not merged); "
+          f"skipped parsing {unchanged} ({resumed} resumed past from an interrupted run).")
 
-    return len(changed)
+    return len(committed)
 
 
 
 
-def upsert_fundamentals(companyfacts_zip: str, securities_df: pd.DataFrame, stop_early: int = 0) -> float:
+def upsert_fundamentals(companyfacts_zip: str,
+                        securities_df: pd.DataFrame,
+                        stop_early: int = 0,
+                        workers: int = PARSE_WORKERS,
+                        queue_depth: int = WRITE_QUEUE_DEPTH,
+                        copy_format: str = COPY_FORMAT,
+                        columnar: bool = False,
+                        parquet_path: str | None = None,
+                        staging_kind: str = STAGING_KIND,
+                        staging_index: bool = STAGING_INDEX,
+                        shards: int = WRITE_SHARDS,
+                        submissions_zip: str | None = None,
+                        dry_run: bool = False,
+                        snapshot_path: str = CD_SNAPSHOT_PATH) -> float:
+    if shards < 1 or workers < 1:
+        raise ValueError(f"shards and workers must be at least 1 (got shards={shards}, workers={workers})")
     # Pre-build a set for O(1) membership tests
     valid_ciks = set(int(x) for x in securities_df["cik"].dropna().astype("int64").tolist())
     t0_dt = datetime.now()
     t0 = time.perf_counter()
+
+    # Plan offline first: diff this archive's central directory against the
+    # snapshot left by the last fully successful run. The ledger still
+    # decides what actually gets parsed; the snapshot only lets dry runs and
+    # no-change mornings skip the database.
+    metas, zip_index, positions = scan_candidates(companyfacts_zip, valid_ciks, stop_early)
+    cd = cd_table(zip_index, positions)
+    prev = read_snapshot(snapshot_path)
+    changed_mask = diff_snapshot(prev, cd)
+    n_changed = int(changed_mask.sum())
+    print(f"Plan: {len(metas)} candidates | {n_changed} changed since "
+          f"{'last snapshot' if prev is not None else 'forever (no snapshot)'} "
+          f"({time.perf_counter() - t0:.3f}s)")
+    if dry_run:
+        todo = [m for m, c in zip(metas, changed_mask) if c]
+        for m in todo[:20]:
+            print(f"  would check {m['asset_path']} ({m['byte_size']} bytes)")
+        if len(todo) > 20:
+            print(f"  ... and {len(todo) - 20} more")
+        return time.perf_counter() - t0
+
+    if prev is not None and n_changed == 0:
+        print("Nothing changed since the last successful run; skipping parse.")
+        return time.perf_counter() - t0
+
+    # real filing dates come from submissions.zip; without it the extractor
+    # falls back to each fact's period end date
+    index_dir = None
+    if submissions_zip:
+        build_filing_index(submissions_zip, FILING_INDEX_DIR)
+        index_dir = FILING_INDEX_DIR
     with psycopg.connect(DATABASE_URL, autocommit=False) as conn:
         ensure_tables(conn)
-        changed = stream_parse_zip_json(conn, companyfacts_zip, valid_ciks, stop_early=stop_early)
+        changed = stream_parse_zip_json(conn, companyfacts_zip, valid_ciks,
+                                        stop_early=stop_early, workers=workers,
+                                        queue_depth=queue_depth, copy_format=copy_format,
+                                        columnar=columnar, parquet_path=parquet_path,
+                                        staging_kind=staging_kind, staging_index=staging_index,
+                                        shards=shards, index_dir=index_dir,
+                                        candidates=(metas, zip_index))
         with conn.cursor() as cur:
             cur.execute(
                 LOG_UPLOAD_PG,
@@ -165,17 +267,67 @@ def upsert_fundamentals(companyfacts_zip: str, securities_df: pd.DataFrame, stop
                 }
             )
 
+    # only now is every candidate in the ledger; a failed run raised above
+    # and leaves the old snapshot in place
+    write_snapshot(snapshot_path, cd)
+
     return time.perf_counter() - t0
 
 
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load companyfacts.zip into fundamentals_raw.")
+    parser.add_argument("--workers", type=positive_int, default=PARSE_WORKERS,
+                        help="Processes used to parse zip members (1 = in-process).")
+    parser.add_argument("--stop-early", dest="stop_early", type=int, default=1000,
+                        help="Limit matched CIKs processed (0 = all).")
+    parser.add_argument("--queue-depth", dest="queue_depth", type=int, default=WRITE_QUEUE_DEPTH,
+                        help="Chunks that may wait on the staging writer before parsing blocks.")
+    parser.add_argument("--copy-format", dest="copy_format", choices=("binary", "csv"), default=COPY_FORMAT,
+                        help="COPY path into staging; csv is the older text fallback.")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Extract into Arrow record batches instead of row tuples.")
+    parser.add_argument("--parquet-out", dest="parquet_out", default=None,
+                        help="With --columnar, also write every staged chunk to this Parquet file.")
+    parser.add_argument("--staging", dest="staging_kind", choices=("temp", "unlogged"), default=STAGING_KIND,
+                        help="Kind of per-session staging table.")
+    parser.add_argument("--staging-index", dest="staging_index", action=argparse.BooleanOptionalAction,
+                        default=STAGING_INDEX, help="Index staging on the merge key before each merge.")
+    parser.add_argument("--shards", type=positive_int, default=WRITE_SHARDS,
+                        help="Database connections to merge on, partitioned by CIK hash.")
+    parser.add_argument("--submissions", default=os.path.join(SEC_DL_DIR, "submissions.zip"),
+                        help="submissions.zip used for filing dates (skipped if the file is missing).")
+    parser.add_argument("--dry-run", dest="dry_run", action="store_true",
+                        help="Print what changed since the last snapshot and exit without touching the database.")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
     # 1) for daily runner: pass in today's securities_df
     # 2) for local dev, read a temp CSV produced earlier
+    args = parse_args()
     df = pd.read_csv("data/temp/temp_sec_table.csv")
 
     elapsed = upsert_fundamentals(
         os.path.join(SEC_DL_DIR, "companyfacts.zip"),
         df,
-        stop_early=1000  # or set to an integer to limit matched CIKs processed
+        stop_early=args.stop_early,
+        workers=args.workers,
+        queue_depth=args.queue_depth,
+        copy_format=args.copy_format,
+        columnar=args.columnar,
+        parquet_path=args.parquet_out,
+        staging_kind=args.staging_kind,
+        staging_index=args.staging_index,
+        shards=args.shards,
+        submissions_zip=args.submissions if os.path.exists(args.submissions) else None,
+        dry_run=args.dry_run,
     )
-    print(f"ETL completed in {elapsed:.2f}s")
\ No newline at end of file
+    print(f"ETL completed in {elapsed:.2f}s")
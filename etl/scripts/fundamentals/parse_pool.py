@@ -0,0 +1,140 @@
+import hashlib
+from io import BytesIO
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from etl.scripts.fundamentals.config import FUND_COLS, TAG_MAP, PARSE_PREFETCH
+from etl.scripts.fundamentals.json import extract_rows_from_json, dedupe_rows
+from etl.scripts.fundamentals.columnar import FUND_COLUMNS, extract_batch_from_json, dedupe_batch
+from etl.scripts.fundamentals.filing_index import FilingIndex
+from etl.scripts.utilities.schema import required_positions
+from etl.scripts.utilities.zip import MappedZip, ZipIndex
+
+
+# Tuples come out of the extractor already typed, so of FUND_COLUMNS only the
+# NOT NULL checks can fail; the columnar path runs the full coerce
+REQUIRED_IDX = required_positions(FUND_COLUMNS, FUND_COLS)
+
+# Each worker process opens the archive (and filing index) once and keeps it for its lifetime
+_worker_zf: Optional[MappedZip] = None
+_worker_index: Optional[FilingIndex] = None
+
+
+Parsed = Union[List[Tuple], pa.RecordBatch]
+
+
+def parse_member(zf: MappedZip,
+                 meta: Dict[str, Any],
+                 columnar: bool = False,
+                 filing_dates: Optional[FilingIndex] = None) -> Tuple[Parsed, int]:
+    """
+    Read one CIK member and return its rows (or a RecordBatch) with a usable
+    filing_date, deduped on the fundamentals_raw key, plus how many
+    duplicate rows were dropped.
+    """
+
+    name = meta["asset_path"]
+    raw = zf.read(name)
+    if columnar:
+        batch = extract_batch_from_json(int(meta["natural_key"]), raw, source_file=name,
+                                        TAG_MAP=TAG_MAP, filing_dates=filing_dates)
+        kept = dedupe_batch(batch)
+        return kept, batch.num_rows - kept.num_rows
+    rows = extract_rows_from_json(int(meta["natural_key"]), raw, source_file=name,
+                                  TAG_MAP=TAG_MAP, filing_dates=filing_dates)
+    rows = [r for r in rows if all(r[i] is not None for i in REQUIRED_IDX)]
+    kept = dedupe_rows(rows)
+    return kept, len(rows) - len(kept)
+
+
+def fingerprint(parsed: Parsed) -> str:
+    """
+    sha256 of the extracted rows, in extraction order. Two documents that
+    differ only in tags outside TAG_MAP hash the same. Tuples and Arrow
+    batches encode values differently, so switching modes reloads once.
+    """
+    h = hashlib.sha256()
+    if isinstance(parsed, pa.RecordBatch):
+        buf = BytesIO()
+        pa_csv.write_csv(parsed, buf, pa_csv.WriteOptions(include_header=False))
+        h.update(buf.getbuffer())
+    else:
+        for r in parsed:
+            h.update("\x1f".join("" if v is None else str(v) for v in r).encode())
+            h.update(b"\n")
+    return h.hexdigest()
+
+
+def _parse_and_hash(zf: MappedZip,
+                    meta: Dict[str, Any],
+                    columnar: bool,
+                    filing_dates: Optional[FilingIndex]) -> Tuple[Parsed, str, int]:
+    parsed, dups = parse_member(zf, meta, columnar, filing_dates)
+    return parsed, fingerprint(parsed), dups
+
+
+def _init_worker(zip_path: str, zip_index: Optional[ZipIndex], index_dir: Optional[str]):
+    global _worker_zf, _worker_index
+    _worker_zf = MappedZip(zip_path, index=zip_index)
+    _worker_index = FilingIndex.open(index_dir) if index_dir else None
+
+
+def _parse_in_worker(meta: Dict[str, Any], columnar: bool) -> Tuple[Parsed, str, int]:
+    assert _worker_zf is not None, "worker zip not initialised"
+    return _parse_and_hash(_worker_zf, meta, columnar, _worker_index)
+
+
+def iter_parsed(zip_path: str,
+                metas: List[Dict[str, Any]],
+                workers: int = 1,
+                columnar: bool = False,
+                index_dir: Optional[str] = None,
+                zip_index: Optional[ZipIndex] = None) -> Iterator[Tuple[Dict[str, Any], Parsed]]:
+    """
+    Yield (meta, rows or RecordBatch) for every meta, in the same order as `metas`.
+    Each meta's "sha256" is set to the fingerprint of its rows (hashed in
+    the worker, so it parallelises with the parse) and "dup_rows" to the
+    duplicate rows dropped before they were returned.
+
+    index_dir points at a filing index (see filing_index.py) used for real
+    filing dates; each process mmaps it rather than receiving a copy.
+    zip_index is the archive's already-parsed central directory, so neither
+    this process nor the workers read it again.
+
+    With workers > 1 members are parsed in a process pool. At most
+    workers * PARSE_PREFETCH members are in flight, so finished results can't
+    pile up faster than the caller drains them.
+    """
+    if workers <= 1:
+        index = FilingIndex.open(index_dir) if index_dir else None
+        with MappedZip(zip_path, index=zip_index) as zf:
+            for m in metas:
+                parsed, m["sha256"], m["dup_rows"] = _parse_and_hash(zf, m, columnar, index)
+                yield m, parsed
+        return
+
+    max_inflight = max(1, workers * PARSE_PREFETCH)
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(zip_path, zip_index, index_dir)) as pool:
+        inflight: deque = deque()
+        it = iter(metas)
+        try:
+            for m in it:
+                inflight.append((m, pool.submit(_parse_in_worker, m, columnar)))
+                if len(inflight) >= max_inflight:
+                    yield _finish(*inflight.popleft())
+            while inflight:
+                yield _finish(*inflight.popleft())
+        finally:
+            for _, fut in inflight:
+                fut.cancel()
+
+
+def _finish(meta: Dict[str, Any], fut) -> Tuple[Dict[str, Any], Parsed]:
+    parsed, meta["sha256"], meta["dup_rows"] = fut.result()
+    return meta, parsed
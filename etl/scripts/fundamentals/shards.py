@@ -0,0 +1,159 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psycopg
+import pyarrow as pa
+
+from etl.scripts.fundamentals.config import CHUNK_ROWS, COPY_FORMAT, STAGING_KIND, STAGING_INDEX, WRITE_QUEUE_DEPTH
+from etl.scripts.fundamentals.columnar import concat_batches
+from etl.scripts.fundamentals.staging import (
+    create_session_staging, drop_session_staging,
+    copy_rows_to_staging, copy_table_to_staging, upsert_from_staging,
+)
+from etl.scripts.fundamentals.writer import StagingWriter, StageTimings
+from etl.scripts.fundamentals.ledger import ledger_bulk_upsert
+
+
+def shard_of(cik: int, n_shards: int) -> int:
+    # Knuth multiplicative hash so runs of neighbouring CIKs still spread out
+    return ((cik * 2654435761) & 0xFFFFFFFF) % n_shards
+
+
+class _Shard:
+    def __init__(self, index: int, conn: psycopg.Connection, staging: str):
+        self.index = index
+        self.conn = conn
+        self.staging = staging
+        self.writer: Optional[StagingWriter] = None
+        self.buffer: list = []
+        self.buffered = 0
+        self.pending: List[Dict[str, Any]] = []     # metas whose rows sit in `buffer`
+        self.committed: List[Dict[str, Any]] = []   # metas whose chunk merged and committed
+        self.error: Optional[BaseException] = None
+
+
+class ShardedWriter:
+    """
+    Route each CIK's rows to one of N connections by cik hash. Every shard
+    has its own session staging table and writer thread, and commits on its
+    own. A chunk's COPY, merge and the ledger rows for the CIKs in it share
+    one transaction, so the ledger never claims a CIK whose rows didn't land
+    and a crashed run resumes from the last committed chunk.
+    """
+
+    def __init__(self,
+                 conns: List[psycopg.Connection],
+                 source_kind: str,
+                 columnar: bool = False,
+                 copy_format: str = COPY_FORMAT,
+                 staging_kind: str = STAGING_KIND,
+                 staging_index: bool = STAGING_INDEX,
+                 queue_depth: int = WRITE_QUEUE_DEPTH,
+                 chunk_rows: Optional[int] = None,
+                 timings: Optional[StageTimings] = None,
+                 on_flushed: Optional[Callable[[Any], None]] = None):
+        self.source_kind = source_kind
+        self.columnar = columnar
+        self.copy_format = copy_format
+        self.staging_index = staging_index
+        self.queue_depth = queue_depth
+        # keep total buffered rows near CHUNK_ROWS no matter how many shards
+        self.chunk_rows = chunk_rows or max(CHUNK_ROWS // len(conns), 10_000)
+        self.timings = timings or StageTimings()
+        self.on_flushed = on_flushed
+        self.shards = [
+            _Shard(i, c, create_session_staging(c, kind=staging_kind))
+            for i, c in enumerate(conns)
+        ]
+
+    def _stage(self, shard: _Shard, name: str) -> str:
+        return name if len(self.shards) == 1 else f"{name}[{shard.index}]"
+
+    def _flush_for(self, shard: _Shard):
+        def flush(chunk: Tuple[Any, List[Dict[str, Any]]]):
+            payload, metas = chunk
+            if payload is not None:
+                with self.timings.timed(self._stage(shard, "copy")):
+                    if isinstance(payload, pa.Table):
+                        copy_table_to_staging(shard.conn, shard.staging, payload, commit=False)
+                    else:
+                        copy_rows_to_staging(shard.conn, shard.staging, payload,
+                                             copy_format=self.copy_format, commit=False)
+                with self.timings.timed(self._stage(shard, "merge")):
+                    upsert_from_staging(shard.conn, shard.staging, index=self.staging_index, commit=False)
+            with self.timings.timed(self._stage(shard, "ledger")):
+                ledger_bulk_upsert(shard.conn, self.source_kind, metas, status="ok")
+                shard.conn.commit()
+            shard.committed.extend(metas)
+            if payload is not None and self.on_flushed is not None:
+                self.on_flushed(payload)
+        return flush
+
+    def __enter__(self):
+        for s in self.shards:
+            s.writer = StagingWriter(self._flush_for(s), queue_depth=self.queue_depth, timings=self.timings)
+            s.writer.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            # queue every shard's tail before waiting, so they drain in parallel
+            for s in self.shards:
+                self._submit(s)
+            for s in self.shards:
+                self._close(s)
+        else:
+            for s in self.shards:
+                if s.writer is not None:
+                    s.writer.__exit__(exc_type, exc, tb)
+        for s in self.shards:
+            if not s.conn.closed:
+                s.conn.rollback()
+                drop_session_staging(s.conn, s.staging)
+        return False
+
+    def add(self, meta: Dict[str, Any], rows=None):
+        """
+        Queue one CIK's parsed rows (a list of tuples or a RecordBatch).
+        rows=None only records the CIK in the ledger with its chunk.
+        """
+        s = self.shards[shard_of(int(meta["natural_key"]), len(self.shards))]
+        if s.error is not None:
+            return  # shard is down; its CIKs stay out of the ledger and retry next run
+        n = 0 if rows is None else rows.num_rows if self.columnar else len(rows)
+        if n:
+            if self.columnar:
+                s.buffer.append(rows)
+            else:
+                s.buffer.extend(rows)
+            s.buffered += n
+        s.pending.append(meta)
+        if s.buffered >= self.chunk_rows:
+            self._submit(s)
+
+    def _submit(self, s: _Shard):
+        if s.error is not None or not s.pending:
+            return
+        payload = None
+        if s.buffer:
+            payload = concat_batches(s.buffer) if self.columnar else s.buffer
+        chunk = (payload, s.pending)
+        s.buffer, s.buffered, s.pending = [], 0, []
+        try:
+            s.writer.submit(chunk)
+        except RuntimeError as e:
+            s.error = e.__cause__ or e
+
+    def _close(self, s: _Shard):
+        try:
+            s.writer.close()
+        except RuntimeError as e:
+            if s.error is None:
+                s.error = e.__cause__ or e
+
+    @property
+    def committed(self) -> List[Dict[str, Any]]:
+        return [m for s in self.shards for m in s.committed]
+
+    @property
+    def failed(self) -> List[Tuple[int, BaseException]]:
+        return [(s.index, s.error) for s in self.shards if s.error is not None]
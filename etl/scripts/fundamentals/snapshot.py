@@ -0,0 +1,63 @@
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from etl.scripts.utilities.zip import ZipIndex
+
+
+# What a member's entry in the central directory looked like on the last
+# fully successful run. Same fingerprint the ledger compares (size, CRC,
+# mtime), just local.
+SNAPSHOT_SCHEMA = pa.schema([
+    ("name", pa.string()),
+    ("size", pa.int64()),
+    ("crc", pa.uint32()),
+    ("dostime", pa.uint32()),
+])
+_FINGERPRINT = ("size", "crc", "dostime")
+
+
+def cd_table(zip_index: ZipIndex, positions: Sequence[int]) -> pa.Table:
+    """Central-directory rows for the members at `positions` in zip_index."""
+    pos = np.asarray(positions, dtype=np.int64)
+    return pa.table({
+        "name": pa.array([zip_index.names[i] for i in pos], pa.string()),
+        "size": zip_index.usize[pos],
+        "crc": zip_index.crc[pos],
+        "dostime": zip_index.dostime[pos],
+    }, schema=SNAPSHOT_SCHEMA)
+
+
+def read_snapshot(path: str) -> Optional[pa.Table]:
+    if not os.path.exists(path):
+        return None
+    try:
+        return pq.read_table(path, schema=SNAPSHOT_SCHEMA)
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def write_snapshot(path: str, table: pa.Table):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def diff_snapshot(prev: Optional[pa.Table], cur: pa.Table) -> np.ndarray:
+    """
+    Boolean mask over `cur`: True where the member is new or its size, CRC
+    or mtime differs from `prev`. Everything is changed without a snapshot.
+    """
+    if prev is None:
+        return np.ones(cur.num_rows, dtype=bool)
+    pos = pc.index_in(cur["name"], value_set=prev["name"])
+    changed = pc.is_null(pos)
+    for col in _FINGERPRINT:
+        differs = pc.not_equal(cur[col], pc.take(prev[col], pos))
+        changed = pc.or_(changed, pc.fill_null(differs, True))
+    return changed.to_numpy(zero_copy_only=False)
@@ -0,0 +1,123 @@
+import csv
+import os
+import secrets
+from io import BytesIO, StringIO
+from typing import Iterable, Tuple
+
+import psycopg
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from psycopg import sql
+
+from etl.scripts.fundamentals.config import FUND_COLS, FUND_COL_TYPES, COPY_FORMAT, STAGING_KIND, STAGING_INDEX
+from etl.sql_scripts.fundamentals import (
+    DDL_SESSION_STAGING, CREATE_STAGING_INDEX, ANALYZE_STAGING, DROP_STAGING_INDEX,
+    UPSERT_FROM_STAGING, TRUNCATE_STAGING, DROP_STAGING,
+)
+
+
+def _fmt(template: str, staging: str) -> sql.Composed:
+    return sql.SQL(template).format(
+        staging=sql.Identifier(staging),
+        index=sql.Identifier(f"{staging}_key"),
+    )
+
+
+def create_session_staging(conn: psycopg.Connection, kind: str = STAGING_KIND) -> str:
+    """
+    Create this session's staging table and return its name.
+
+    kind="temp" lives and dies with the connection; kind="unlogged" survives
+    it (call drop_session_staging) but is visible to other sessions, which
+    helps when debugging a shard. Neither is WAL-logged.
+    """
+    if kind not in ("temp", "unlogged"):
+        raise ValueError(f"unknown staging kind {kind!r}")
+    name = f"staging_fundamentals_{os.getpid()}_{secrets.token_hex(4)}"
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL(DDL_SESSION_STAGING).format(
+            kind=sql.SQL(kind.upper()),
+            staging=sql.Identifier(name),
+        ))
+    conn.commit()
+    return name
+
+
+def drop_session_staging(conn: psycopg.Connection, staging: str):
+    with conn.cursor() as cur:
+        cur.execute(_fmt(DROP_STAGING, staging))
+    conn.commit()
+
+
+def _copy_stmt(staging: str, fmt: str) -> sql.Composed:
+    cols = sql.SQL(", ").join(sql.Identifier(c) for c in FUND_COLS)
+    return sql.SQL("COPY {staging} ({cols}) FROM STDIN WITH (FORMAT {fmt})").format(
+        staging=sql.Identifier(staging), cols=cols, fmt=sql.SQL(fmt)
+    )
+
+
+def _copy_rows_csv(cur: psycopg.Cursor, staging: str, rows: Iterable[Tuple]):
+    # Build CSV in memory
+    buf = StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerows(rows)
+    data = buf.getvalue().encode()
+
+    with cur.copy(_copy_stmt(staging, "csv")) as cp:
+        cp.write(data)
+
+
+def _copy_rows_binary(cur: psycopg.Cursor, staging: str, rows: Iterable[Tuple]):
+    # Rows go straight into the copy stream; psycopg flushes it in small
+    # buffers, so there is never a second full copy of the chunk in memory
+    with cur.copy(_copy_stmt(staging, "binary")) as cp:
+        cp.set_types(FUND_COL_TYPES)
+        for r in rows:
+            cp.write_row(r)
+
+
+def copy_rows_to_staging(conn: psycopg.Connection,
+                         staging: str,
+                         rows: Iterable[Tuple],
+                         copy_format: str = COPY_FORMAT,
+                         commit: bool = True):
+    with conn.cursor() as cur:
+        if copy_format == "csv":
+            _copy_rows_csv(cur, staging, rows)
+        else:
+            _copy_rows_binary(cur, staging, rows)
+
+    if commit:
+        conn.commit()
+
+
+def copy_table_to_staging(conn: psycopg.Connection, staging: str, table: pa.Table, commit: bool = True):
+    """
+    COPY an Arrow table into staging. Arrow's C++ CSV writer encodes each
+    record batch, so no Python row tuples are ever built.
+    """
+    opts = pa_csv.WriteOptions(include_header=False)
+
+    with conn.cursor() as cur:
+        with cur.copy(_copy_stmt(staging, "csv")) as cp:
+            for batch in table.select(FUND_COLS).to_batches():
+                buf = BytesIO()
+                pa_csv.write_csv(batch, buf, opts)
+                cp.write(buf.getbuffer())
+
+    if commit:
+        conn.commit()
+
+
+def upsert_from_staging(conn: psycopg.Connection, staging: str, index: bool = STAGING_INDEX, commit: bool = True):
+    with conn.cursor() as cur:
+        if index:
+            # built after the COPY so loading doesn't pay per-row index upkeep
+            cur.execute(_fmt(CREATE_STAGING_INDEX, staging))
+            cur.execute(_fmt(ANALYZE_STAGING, staging))
+        cur.execute(_fmt(UPSERT_FROM_STAGING, staging))
+        cur.execute(_fmt(TRUNCATE_STAGING, staging))
+        if index:
+            cur.execute(_fmt(DROP_STAGING_INDEX, staging))
+    if commit:
+        conn.commit()
@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from etl.scripts.fundamentals.config import WRITE_QUEUE_DEPTH
+
+
+class StageTimings:
+    """Wall-clock seconds and call counts per named stage, safe across threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.calls[stage] += 1
+
+    @contextmanager
+    def timed(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - t0)
+
+    def report(self) -> str:
+        with self._lock:
+            parts = [f"{k}={v:.2f}s/{self.calls[k]}" for k, v in sorted(self.seconds.items())]
+        return "Stage timings: " + " | ".join(parts)
+
+
+_STOP = object()
+
+
+class StagingWriter:
+    """
+    Background thread that drains chunks through `flush` while the caller
+    keeps parsing. The queue holds at most `queue_depth` pending chunks, so
+    with the default of 1 we get classic double buffering: one chunk being
+    written, one waiting, and the next one filling in the producer.
+
+    `backpressure` time is the producer blocked on a full queue (DB is the
+    bottleneck); `writer_idle` is the writer waiting on an empty queue
+    (parsing is the bottleneck).
+    """
+
+    def __init__(self,
+                 flush: Callable[[Any], None],
+                 queue_depth: int = WRITE_QUEUE_DEPTH,
+                 timings: Optional[StageTimings] = None):
+        self._flush = flush
+        self._q: queue.Queue = queue.Queue(maxsize=max(1, queue_depth))
+        self.timings = timings or StageTimings()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="staging-writer", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Don't let a producer error hang on a blocked writer
+            self._abort()
+        return False
+
+    def submit(self, chunk: Any):
+        """Hand a chunk to the writer; blocks while the queue is full."""
+        t0 = time.perf_counter()
+        while True:
+            self._raise_if_failed()
+            try:
+                self._q.put(chunk, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        self.timings.add("backpressure", time.perf_counter() - t0)
+
+    def close(self):
+        """Flush everything still queued, stop the thread and surface errors."""
+        self._put_stop()
+        self._thread.join()
+        self._raise_if_failed()
+
+    def _abort(self):
+        # Drop pending chunks so the sentinel always fits
+        while True:
+            try:
+                self._q.get_nowait()
+            except queue.Empty:
+                break
+        self._put_stop()
+        self._thread.join()
+
+    def _put_stop(self):
+        while self._thread.is_alive():
+            try:
+                self._q.put(_STOP, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise RuntimeError("staging writer failed") from self._error
+
+    def _run(self):
+        while True:
+            t0 = time.perf_counter()
+            chunk = self._q.get()
+            self.timings.add("writer_idle", time.perf_counter() - t0)
+            if chunk is _STOP:
+                return
+            if self._error is not None:
+                continue  # keep draining so the producer never blocks forever
+            try:
+                self._flush(chunk)
+            except BaseException as e:
+                self._error = e
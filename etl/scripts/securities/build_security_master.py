@@ -7,11 +7,15 @@ import hashlib
 from datetime import datetime, timezone
 from typing import Tuple, Dict, cast
 import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import re
 from dotenv import load_dotenv
 import zoneinfo
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from etl.scripts.utilities.source_cache import cached_fetch
 
 
 NY = zoneinfo.ZoneInfo("America/New_York")
@@ -28,47 +32,60 @@ NASDAQ_NASDAQ_URL : str = cast(str, os.getenv('NAS_URL'))
 NASDAQ_OTHER_URL :str  = cast(str, os.getenv('OTHER_URL'))
 SEC_TICKERS_URL : str = cast(str, os.getenv('SEC_TICKERS'))
 CONTACT_EMAIL : str = cast(str, os.getenv('CONTACT_EMAIL'))
+# validators + parsed Parquet copy of each source, see utilities/source_cache.py
+SECURITIES_CACHE_DIR : str = os.getenv('SECURITIES_CACHE_DIR', 'data/listings/cache')
+
+SEC_HEADERS = {
+    "User-Agent": f"ValueInvestingDash/0.1 (Michael C. Eaton; {CONTACT_EMAIL})",
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "Referer": "https://www.sec.gov/edgar/searchedgar/companysearch.html",
+}
+LISTING_HEADERS = {
+    "User-Agent": "ValueInvestingDash/0.1 (+https://example.com; contact: you@example.com)"
+}
 
 EXCLUDE_PATTERNS = {
     # Exchange-traded notes
-    "ETN": re.compile(r"\bETN(s)?\b|Exchange[- ]Traded Note(s)?", flags=re.IGNORECASE),
+    "ETN": re.compile(r"\bETN(?:s)?\b|Exchange[- ]Traded Note(?:s)?", flags=re.IGNORECASE),
 
     # Exchange-traded debt / “baby bonds” / notes
     "ETD_NOTES": re.compile(
-        r"\b(?:Senior|Subordinated|Convertible|Fixed[- ]Rate|Floating[- ]Rate)\s+Note(s)?\b"
-        r"|\bDebenture(s)?\b|\bBond(s)?\b|\bDue\s+20\d{2}\b",
+        r"\b(?:Senior|Subordinated|Convertible|Fixed[- ]Rate|Floating[- ]Rate)\s+Note(?:s)?\b"
+        r"|\bDebenture(?:s)?\b|\bBond(?:s)?\b|\bDue\s+20\d{2}\b",
         flags=re.IGNORECASE
     ),
 
     # Preferred stock and depositary shares of preferred
     "PREFERRED": re.compile(
-        r"\bPreferred\b|\bPreference\b|\bPfd\b|Depositary Share(s)?",
+        r"\bPreferred\b|\bPreference\b|\bPfd\b|Depositary Share(?:s)?",
         flags=re.IGNORECASE
     ),
 
     # ADR/ADS wrappers
     "ADR_ADS": re.compile(
-        r"\bADR(s)?\b|\bADS\b|\bAmerican\s+Depositary\b",
+        r"\bADR(?:s)?\b|\bADS\b|\bAmerican\s+Depositary\b",
         flags=re.IGNORECASE
     ),
 
     # SPAC junk and general units/rights/warrants
     "UNITS_RIGHTS_WARRANTS": re.compile(
-        r"\bUnit(s)?\b|\bSubunit(s)?\b|\bRight(s)?\b|\bWarrant(s)?\b|\bWRT\b",
+        r"\bUnit(?:s)?\b|\bSubunit(?:s)?\b|\bRight(?:s)?\b|\bWarrant(?:s)?\b|\bWRT\b",
         flags=re.IGNORECASE
     ),
 
     # CVRs
-    "CVR": re.compile(r"\bContingent Value Right(s)?\b|\bCVR(s)?\b", flags=re.IGNORECASE),
+    "CVR": re.compile(r"\bContingent Value Right(?:s)?\b|\bCVR(?:s)?\b", flags=re.IGNORECASE),
 
     # Partnership units (not corporate common)
     "PARTNERSHIP_UNITS": re.compile(
-        r"\bCommon Unit(s)?\b|\bLP Unit(s)?\b|\bLimited Partnership\b",
+        r"\bCommon Unit(?:s)?\b|\bLP Unit(?:s)?\b|\bLimited Partnership\b",
         flags=re.IGNORECASE
     ),
 
     # Foreign ordinary shares (exclude only if you want strictly “US common only”)
-    "ORDINARY_SHARES": re.compile(r"\bOrdinary Share(s)?\b", flags=re.IGNORECASE),
+    "ORDINARY_SHARES": re.compile(r"\bOrdinary Share(?:s)?\b", flags=re.IGNORECASE),
 
     # Trust-y debt wrappers
     "TRUST_DEBT": re.compile(r"\bCapital Trust\b|\bTrust Preferred\b", flags=re.IGNORECASE),
@@ -77,39 +94,57 @@ EXCLUDE_PATTERNS = {
     "WHEN_ISSUED": re.compile(r"\bWhen[- ]Issued\b|\bWI\b", flags=re.IGNORECASE),
 }
 
+# What the old separate ADR/preferred filter caught. Mostly overlaps ADR_ADS
+# and PREFERRED, but without word boundaries, so keep it as its own label.
+BAD_NAME_PATTERN = r"\bADR\b|\bAmerican Depositary\b|Depositary Share|Preference|Preferred"
+
+EXCLUSION_LABELS = [*EXCLUDE_PATTERNS, "BAD_NAME"]
+
+# One alternation with a named group per label, so every name is scanned once.
+# The reason is the label of the leftmost match (ties go to the earlier label).
+_CLASSIFIER_SRC = "(?i)" + "|".join(
+    f"(?P<{label}>{src})"
+    for label, src in [*((k, p.pattern) for k, p in EXCLUDE_PATTERNS.items()), ("BAD_NAME", BAD_NAME_PATTERN)]
+)
+_CLASSIFIER = re.compile(_CLASSIFIER_SRC)
+
+
+def exclusion_reasons(name_series: pd.Series) -> pd.Series:
+    """
+    Exclusion label per name (<NA> for names we keep), in one vectorized
+    regex pass (Arrow/RE2) over the whole column.
+    """
+    names = pa.array(name_series.astype("string"), type=pa.string())
+    hits = pc.extract_regex(names, _CLASSIFIER_SRC)
+    reason = pa.nulls(len(names), pa.string())
+    # exactly one group is non-empty on a matching row
+    for label in EXCLUSION_LABELS:
+        reason = pc.if_else(pc.not_equal(hits.field(label), ""), label, reason)
+    reason = pc.if_else(hits.is_valid(), reason, None)
+    return reason.to_pandas().astype("string").set_axis(name_series.index)
+
 def build_exclusion_mask(name_series: pd.Series) -> pd.Series:
-    s = name_series.astype("string")
-    mask = pd.Series(False, index=s.index)
-    for pat in EXCLUDE_PATTERNS.values():
-        mask |= s.str.contains(pat, na=False)
-    return mask
+    return exclusion_reasons(name_series).notna()
+
+def drop_excluded(df: pd.DataFrame) -> pd.DataFrame:
+    """A master built with keep_excluded=True, minus the rows the classifier rejected."""
+    if "exclusion_reason" not in df.columns:
+        return df
+    return df.loc[df["exclusion_reason"].isna()].drop(columns=["exclusion_reason"])
 
 def first_exclusion_reason(name: str) -> str | None:
     if not isinstance(name, str):
         return None
-    for label, pat in EXCLUDE_PATTERNS.items():
-        if pat.search(name):
-            return label
-    return None
+    m = _CLASSIFIER.search(name)
+    return m.lastgroup if m else None
 
 
-# ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-# OUT_DIR = os.path.join(ROOT, "data", "listings")
-# os.makedirs(OUT_DIR, exist_ok=True)
+# Parquet snapshot of what was last loaded into `securities`, one per day
+OUT_DIR : str = os.getenv('SECURITIES_SNAPSHOT_DIR', 'data/listings')
 
 
-def load_sec_company_tickers() -> pd.DataFrame:
-    SEC_HEADERS = {
-    "User-Agent": f"ValueInvestingDash/0.1 (Michael C. Eaton; {CONTACT_EMAIL})",
-    "Accept": "application/json",
-    "Accept-Encoding": "gzip, deflate",
-    "Connection": "keep-alive",
-    "Referer": "https://www.sec.gov/edgar/searchedgar/companysearch.html",
-}
-    r = requests.get(SEC_TICKERS_URL, headers=SEC_HEADERS, timeout=30)
-    r.raise_for_status()
-
-    obj = r.json()
+def _parse_sec_tickers(raw: bytes) -> pd.DataFrame:
+    obj = json.loads(raw)
     rows = pd.DataFrame.from_records(list(obj.values()))
     rows['ticker'] = rows['ticker'].str.upper().str.strip()
     rows['cik'] = rows['cik_str'].astype('Int64')
@@ -118,41 +153,41 @@ def load_sec_company_tickers() -> pd.DataFrame:
 
     return rows[['ticker', 'cik', 'company_name']]
 
-def enrich_with_cik(df: pd.DataFrame) -> pd.DataFrame:
-    sec = load_sec_company_tickers()
+def load_sec_company_tickers(offline: bool = False) -> pd.DataFrame:
+    return cached_fetch("sec_tickers", SEC_TICKERS_URL, _parse_sec_tickers,
+                        SECURITIES_CACHE_DIR, headers=SEC_HEADERS, offline=offline)
+
+def enrich_with_cik(df: pd.DataFrame, sec: pd.DataFrame | None = None) -> pd.DataFrame:
+    if sec is None:
+        sec = load_sec_company_tickers()
     out = df.merge(sec, left_on='symbol', right_on='ticker', how='left')
     out = out.drop(columns=['ticker'])
 
     return out
 
 
-def _get(url: str) -> str:
-    # fetch listings
-    headers = {
-        "User-Agent": "ValueInvestingDash/0.1 (+https://example.com; contact: you@example.com)"
-    }
-    r = None
-    for attempt in range(3):
-        r = requests.get(url, headers=headers, timeout=30)
-        if r.ok:
-            return r.text
-    if r is not None:
-        r.raise_for_status() 
-    return ""
-
-def _read_pipe_table(text: str) -> pd.DataFrame:
-    # convert data from pipe delim text to data frame
-    
-    return pd.read_csv(
-        io.StringIO(text),
-        sep='|',
-        engine='python',
-        skipfooter=1,
-        dtype=str
+def _strip_footer(raw: bytes) -> bytes:
+    # Nasdaq Trader files end with a "File Creation Time: ..." line; cut it
+    # off here so the C parser can read the rest (skipfooter forced engine='python')
+    body = raw.rstrip(b"\r\n")
+    cut = body.rfind(b"\n")
+    if body[cut + 1:].startswith(b"File Creation Time"):
+        body = body[:max(cut, 0)]
+    return body
+
+def _read_pipe_table(raw: bytes) -> pd.DataFrame:
+    # convert pipe delim bytes to a frame of Arrow-backed strings
+    body = _strip_footer(raw)
+    header = body[:body.find(b"\n")].rstrip(b"\r").decode().split("|")
+    table = pacsv.read_csv(
+        io.BytesIO(body),
+        parse_options=pacsv.ParseOptions(delimiter="|"),
+        # every column as a plain string: no type inference, and "NA" stays a ticker
+        convert_options=pacsv.ConvertOptions(column_types={c: pa.string() for c in header}),
     )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
 
-def load_nasdaqlisted() -> pd.DataFrame:
-    raw = _get(NASDAQ_NASDAQ_URL)
+def _parse_nasdaqlisted(raw: bytes) -> pd.DataFrame:
     df = _read_pipe_table(raw)
 
 
@@ -178,8 +213,11 @@ def load_nasdaqlisted() -> pd.DataFrame:
 
     return out
 
-def load_otherlisted() -> pd.DataFrame:
-    raw = _get(NASDAQ_OTHER_URL)
+def load_nasdaqlisted(offline: bool = False) -> pd.DataFrame:
+    return cached_fetch("nasdaqlisted", NASDAQ_NASDAQ_URL, _parse_nasdaqlisted,
+                        SECURITIES_CACHE_DIR, headers=LISTING_HEADERS, offline=offline)
+
+def _parse_otherlisted(raw: bytes) -> pd.DataFrame:
     df = _read_pipe_table(raw)
     df = df.rename(columns=str.strip)
 
@@ -211,13 +249,34 @@ def load_otherlisted() -> pd.DataFrame:
     })
     return out
 
-def build_security_master() -> pd.DataFrame:
-    a = load_nasdaqlisted()
-    b = load_otherlisted()
+def load_otherlisted(offline: bool = False) -> pd.DataFrame:
+    return cached_fetch("otherlisted", NASDAQ_OTHER_URL, _parse_otherlisted,
+                        SECURITIES_CACHE_DIR, headers=LISTING_HEADERS, offline=offline)
+
+def fetch_sources(offline: bool = False) -> Dict[str, pd.DataFrame]:
+    """Both listing files and the SEC ticker map, fetched concurrently."""
+    loaders = {
+        "nasdaqlisted": load_nasdaqlisted,
+        "otherlisted": load_otherlisted,
+        "sec_tickers": load_sec_company_tickers,
+    }
+    with ThreadPoolExecutor(max_workers=len(loaders)) as pool:
+        futs = {name: pool.submit(fn, offline) for name, fn in loaders.items()}
+        return {name: f.result() for name, f in futs.items()}
+
+def build_security_master(keep_excluded: bool = False,
+                          sources: Dict[str, pd.DataFrame] | None = None) -> pd.DataFrame:
+    """
+    keep_excluded keeps rows the name classifier rejects, labelled in an
+    `exclusion_reason` column, instead of dropping them. `sources` is what
+    fetch_sources() returns; the listings are fetched when it's omitted.
+    """
+    if sources is None:
+        sources = {"nasdaqlisted": load_nasdaqlisted(), "otherlisted": load_otherlisted()}
 
     # Higher priority rows sort first
-    a["_prio"] = 0
-    b["_prio"] = 1
+    a = sources["nasdaqlisted"].assign(_prio=0)
+    b = sources["otherlisted"].assign(_prio=1)
 
     # Combine
     df = pd.concat([a, b], ignore_index=True)
@@ -237,10 +296,6 @@ def build_security_master() -> pd.DataFrame:
           .drop(columns=["_prio"])
     )
 
-    # Remove ADRs and preferreds etc. Use non-capturing groups and explicit regex=True
-    bad_name_patterns = r"(?i)\bADR\b|\bAmerican Depositary\b|Depositary Share|Preference|Preferred"
-    df = df.loc[~df["security_name"].str.contains(bad_name_patterns, na=False, regex=True)].copy()
-
     # Exclude test issues and ETFs; coerce to boolean first
     test_issue = df.get("test_issue")
     if test_issue is not None:
@@ -250,13 +305,14 @@ def build_security_master() -> pd.DataFrame:
     if etf is not None:
         df = df.loc[~etf.astype("boolean").fillna(False)].copy()
 
-    # Build exclusion mask AFTER all the above mutations so the index matches,
-    # or explicitly reindex to avoid the warning.
-    exclude_mask = build_exclusion_mask(df["security_name"]).reindex(df.index, fill_value=False)
-
-    before = len(df)
-    df = df.loc[~exclude_mask].copy()
-    print(f"Filtered non-common instruments by name: {before - len(df)} removed")
+    # One classifier pass over the names: ADRs, preferreds, notes, units etc.
+    df["exclusion_reason"] = exclusion_reasons(df["security_name"])
+    excluded = df["exclusion_reason"].notna()
+    counts = df.loc[excluded, "exclusion_reason"].value_counts()
+    print(f"Filtered non-common instruments by name: {int(excluded.sum())} excluded"
+          + (f" ({', '.join(f'{k} {v}' for k, v in counts.items())})" if len(counts) else ""))
+    if not keep_excluded:
+        df = df.loc[~excluded].drop(columns=["exclusion_reason"])
 
     # Sanity on ticker lengths (don’t filter, just warn)
     too_long = ~df["symbol"].str.len().between(1, 7)
@@ -280,24 +336,27 @@ def build_security_master() -> pd.DataFrame:
     return df
 
 
-# def snapshot_path(ts: datetime, ext: str = 'parquet') -> str:
-#     date_tag = ts.strftime('%Y-%m-%d')
-#     return os.path.join(OUT_DIR, f'security_master_{date_tag}.{ext}')
-
-# def write_snapshot(df: pd.DataFrame, ts:datetime) -> str:
-#     csv_path = snapshot_path(ts, 'csv')
-#  #   pq_path = snapshot_path(ts, 'parquet')
-
-#     df.to_csv(csv_path, index=False)
-#  #   df.to_parquet(pq_path, index=False)
-#     print(f"Wrote {len(df)} rows to {csv_path}")
-#     return csv_path
-# def latest_previous_snapshot(now: datetime) -> str:
-#     files = sorted(p for p in os.listdir(OUT_DIR) if p.startswith("security_master_") and p.endswith(".parquet"))
-#     if not files:
-#         return ""
-#     # choose the most recent prior to today if multiple exist
-#     return os.path.join(OUT_DIR, files[-1])
+def snapshot_path(ts: datetime, ext: str = 'parquet') -> str:
+    date_tag = ts.strftime('%Y-%m-%d')
+    return os.path.join(OUT_DIR, f'security_master_{date_tag}.{ext}')
+
+def write_snapshot(df: pd.DataFrame, ts: datetime) -> str:
+    os.makedirs(OUT_DIR, exist_ok=True)
+    pq_path = snapshot_path(ts)
+    tmp = pq_path + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, pq_path)
+    print(f"Wrote {len(df)} rows to {pq_path}")
+    return pq_path
+
+def latest_previous_snapshot() -> str:
+    if not os.path.isdir(OUT_DIR):
+        return ""
+    files = sorted(p for p in os.listdir(OUT_DIR) if p.startswith("security_master_") and p.endswith(".parquet"))
+    if not files:
+        return ""
+    # dates sort lexically, so the last one is the most recent run
+    return os.path.join(OUT_DIR, files[-1])
 
 def _map_yn_bool(series: pd.Series | None) -> pd.Series:
     # Robust and quiet: treat anything == 'Y' (case-insensitive) as True, else False
@@ -306,34 +365,55 @@ def _map_yn_bool(series: pd.Series | None) -> pd.Series:
         return s.str.upper().eq("Y").fillna(False)
     return pd.Series()
 
-def diff_snapshots(prev_path: str, curr_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+def row_hashes(df: pd.DataFrame, key: str) -> pd.Series:
+    """uint64 hash of every non-key column per row, indexed by key."""
+    cols = sorted(c for c in df.columns if c != key)
+    # hash the text form so Int64 vs int64 or str vs Arrow strings don't count as changes
+    h = pd.util.hash_pandas_object(df[cols].astype("string").fillna(""), index=False)
+    return pd.Series(h.to_numpy(), index=df[key].to_numpy())
+
+def diff_snapshots(prev_path: str, curr_df: pd.DataFrame, key: str = "symbol") -> Dict[str, pd.DataFrame]:
+    """
+    Rows of curr_df split into added / changed / unchanged against the
+    snapshot at prev_path (by a per-row hash, keyed on `key`), plus the
+    snapshot rows that disappeared as removed. No snapshot: all added.
+    """
+    empty = curr_df.iloc[0:0]
     if not prev_path:
-        return {"added": curr_df.copy(), "removed": pd.DataFrame(columns=curr_df.columns), "changed": pd.DataFrame()}
+        return {"added": curr_df.copy(), "changed": empty, "unchanged": empty,
+                "removed": pd.DataFrame(columns=curr_df.columns)}
 
     prev = pd.read_parquet(prev_path)
-    key = "symbol"
-
-    # adds/removes
-    added = curr_df[~curr_df[key].isin(prev[key])]
-    removed = prev[~prev[key].isin(curr_df[key])]
-
-    # changed rows: same symbol exists, but any non-key field differs
-    merged = prev.merge(curr_df, on=key, how="inner", suffixes=("_prev", "_curr"))
-    compare_cols = [c for c in curr_df.columns if c != key]
-    changed_mask = pd.Series(False, index=merged.index, dtype=bool)
-    for c in compare_cols:
-        a = f"{c}_prev"
-        b = f"{c}_curr"
-        # compare as strings to avoid NaN nuisances
-        changed_mask = changed_mask | (merged[a].astype(str).fillna("") != merged[b].astype(str).fillna(""))
-
-    changed = merged.loc[changed_mask, [key] + sum(([f"{c}_prev", f"{c}_curr"] for c in compare_cols), [])]
-    return {"added": added, "removed": removed, "changed": changed}
-
-def get_securities_list() -> pd.DataFrame:
+    dups = prev[key].duplicated(keep="last")
+    if dups.any():
+        # written before the cik dedupe, or edited by hand; the load keeps
+        # the last row per key, so compare against that one
+        print(f"{prev_path}: dropping {int(dups.sum())} duplicate {key} rows")
+        prev = prev.loc[~dups]
+    cols = [c for c in curr_df.columns if c in prev.columns]
+    prev_h = row_hashes(prev[cols], key)
+    curr_h = row_hashes(curr_df[cols], key)
+
+    pos = prev_h.index.get_indexer(curr_h.index)
+    known = pos >= 0
+    same = known & (prev_h.to_numpy()[pos] == curr_h.to_numpy())
+
+    return {
+        "added": curr_df.loc[~known],
+        "changed": curr_df.loc[known & ~same],
+        "unchanged": curr_df.loc[same],
+        "removed": prev.loc[~prev[key].isin(curr_df[key])],
+    }
+
+def get_securities_list(offline: bool = False, keep_excluded: bool = False) -> pd.DataFrame:
+    """
+    offline builds the master from the local source cache without any
+    requests; keep_excluded is passed to build_security_master.
+    """
     now = datetime.now(timezone.utc)
-    df = build_security_master()
-    df = enrich_with_cik(df)
+    sources = fetch_sources(offline=offline)
+    df = build_security_master(keep_excluded=keep_excluded, sources=sources)
+    df = enrich_with_cik(df, sources["sec_tickers"])
     #csv_path = write_snapshot(df, now)
 
    # prev_path = latest_previous_snapshot(now)
@@ -8,8 +8,14 @@ from math import ceil
 import time
 from etl.sql_scripts.securities import *
 from etl.sql_scripts.logs import *
-from etl.scripts.utilities.upsert import dataframe_upsert
+from etl.scripts.utilities.upsert import bulk_merge
+from etl.scripts.securities.build_security_master import (
+    diff_snapshots, latest_previous_snapshot, load_sec_company_tickers, write_snapshot,
+)
 from typing import Tuple
+import pyarrow as pa
+import pyarrow.compute as pc
+from etl.scripts.utilities.schema import Column, apply_schema, coerce, reason_counts
 from datetime import datetime
 
 
@@ -28,59 +34,60 @@ engine = create_engine(DB_URI, pool_pre_ping=True, pool_recycle=1800)
 def ensure_schema(conn):
     conn.execute(text(CREATE_SQL))
 
-def _trim_to_limits(df: pd.DataFrame) -> pd.DataFrame:
-    limits = {"ticker": 7, "name": 40, "exchange": 15, "company_name": 50, "symbol_yf": 7}
-    for col, lim in limits.items():
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.slice(0, lim)
-    return df
-
-def _clean_cik_column(df: pd.DataFrame) -> Tuple[pd.DataFrame, str]:
-    # Treat as string first to avoid float nonsense from CSV like "1374310.0"
-    if "cik" not in df.columns:
+# What a `securities` row must look like; limits match CREATE_SQL
+CIK_COLUMN = Column("cik", pa.int64(), nullable=False, min=1, max=9_999_999_999, clean=r"\D")
+SECURITIES_SCHEMA = [
+    CIK_COLUMN,
+    Column("ticker", pa.string(), nullable=False, max_len=7, truncate=True),
+    Column("name", pa.string(), nullable=False, max_len=40, truncate=True),
+    Column("exchange", pa.string(), nullable=False, max_len=15, truncate=True),
+    Column("company_name", pa.string(), nullable=False, max_len=50, truncate=True),
+    Column("symbol_yf", pa.string(), nullable=False, max_len=7, truncate=True),
+]
+
+# ticker and symbol_yf are kept whole (see CREATE_UNRESOLVED)
+UNRESOLVED_LIMITS = {"name": 80, "exchange": 15, "company_name": 80}
+
+def split_resolved(df_in: pd.DataFrame, today: date) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Split the master into rows that can go into `securities` and rows for
+    `securities_unresolved`, in one vectorized pass. The reason is the first
+    that applies: the name classifier's exclusion label, LENGTH_OVERFLOW
+    (ticker or Yahoo symbol longer than the column), then MISSING_CIK.
+    """
+    if "cik" not in df_in.columns:
         raise ValueError("CSV missing required column 'cik'")
-
-    s = df["cik"].astype(str).str.strip()
-
-    # Drop trailing ".0" produced by spreadsheets/CSVs and remove non-digits
-    s = s.str.replace(r"\.0$", "", regex=True)
-    s = s.str.replace(r"\D", "", regex=True)
-
-    # Empty strings become NaN
-    s = s.replace("", pd.NA)
-    cik = pd.to_numeric(s, errors="coerce")  # pandas nullable Int64 after astype later
-
-    df = df.copy()
-    df["cik"] = cik
-
-    # Range filter for sanity (CIK max 10 digits)
-    bad_mask = df["cik"].isna() | (df["cik"] < 1) | (df["cik"] > 9_999_999_999)
-    note: str = ""
-    if bad_mask.any():
-       # bad_rows = df.loc[bad_mask, ["cik"] + [c for c in df.columns if c != "cik"]].head(10)
-        note = f"{bad_mask.sum()} rows with invalid CIK."
-        print()
-        df = df.loc[~bad_mask]
-
-    # Convert to Python int so the driver binds as integer, not float
-    df["cik"] = df["cik"].astype("Int64").astype(object).apply(lambda x: int(x))
-
-    return df, note
-
-def _coerce_required_strings(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.rename(columns={
-        'symbol':'ticker',
-        'security_name':'name'
+    ticker = df_in["symbol"].astype("string").str.strip()
+    symbol_yf = df_in["symbol_yf"].astype("string").str.strip()
+    _, cik_reason = apply_schema(df_in[["cik"]], [CIK_COLUMN])
+
+    if "exclusion_reason" in df_in.columns:
+        reason = df_in["exclusion_reason"].astype("string")
+    else:
+        reason = pd.Series(pd.NA, index=df_in.index, dtype="string")
+    overflow = (ticker.str.len() > 7) | (symbol_yf.str.len() > 7)
+    reason = reason.mask(reason.isna() & overflow.fillna(False), "LENGTH_OVERFLOW")
+    no_cik = pc.is_valid(cik_reason).to_numpy(zero_copy_only=False)
+    reason = reason.mask(reason.isna() & no_cik, "MISSING_CIK")
+    bad = reason.notna().to_numpy()
+
+    resolved = df_in.loc[~bad].drop(columns=["exclusion_reason"], errors="ignore")
+
+    company = df_in.loc[bad, "company_name"] if "company_name" in df_in.columns else None
+    unresolved = pd.DataFrame({
+        "ticker": ticker[bad],
+        "name": df_in.loc[bad, "security_name"].astype("string").str.strip(),
+        "exchange": df_in.loc[bad, "exchange"].astype("string").str.strip(),
+        "company_name": company.astype("string").str.strip() if company is not None else pd.NA,
+        "symbol_yf": symbol_yf[bad],
+        "first_seen": today,
+        "last_seen": today,
+        "reason": reason[bad],
     })
-    required = ["ticker", "name", "exchange", "company_name", "symbol_yf"]
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        raise ValueError(f"CSV missing required columns: {missing}")
-    for c in required:
-        df[c] = df[c].astype(str).str.strip()
-    return df
-
-        
+    for col, lim in UNRESOLVED_LIMITS.items():
+        unresolved[col] = unresolved[col].astype("string").str.slice(0, lim)
+    return resolved, unresolved.reset_index(drop=True)
+
 def acquire_lock(conn) -> bool:
     got = conn.execute(
         text("select pg_try_advisory_lock(:k)"),
@@ -94,6 +101,28 @@ def release_lock(conn) -> None:
         {"k": ADVISORY_LOCK_KEY}
     )
 
+SNAPSHOT_COLS = ["cik", "ticker", "name", "exchange", "company_name", "symbol_yf"]
+UNRESOLVED_COLS = ["ticker", "name", "exchange", "company_name", "symbol_yf", "first_seen", "last_seen", "reason"]
+
+def bump_last_seen(conn, ciks: list, today: date) -> Tuple[int, list]:
+    """Move last_seen to today for ciks in one statement. Returns (bumped, ciks not in the table)."""
+    if not ciks:
+        return 0, []
+    bumped, present = conn.execute(text(BUMP_LAST_SEEN), {"ciks": ciks, "today": today}).one()
+    missing = []
+    if present < len(ciks):
+        missing = list(conn.execute(text(MISSING_CIKS), {"ciks": ciks}).scalars())
+    return int(bumped), missing
+
+def upsert_unresolved(conn, df: pd.DataFrame) -> Tuple[int, int]:
+    """COPY + merge rows into securities_unresolved. Returns (inserted, updated)."""
+    conn.execute(text(CREATE_UNRESOLVED))
+    if df.empty:
+        return 0, 0
+    # one row per (ticker, exchange), or the merge would hit a key twice
+    df = df.drop_duplicates(subset=["ticker", "exchange"], keep="last")
+    return bulk_merge(conn, df, "securities_unresolved", MERGE_UNRESOLVED, columns=UNRESOLVED_COLS)
+
 def update_log(error_msg: str,
                t0: datetime,
                t1: datetime,
@@ -121,10 +150,31 @@ def db_update(df_in: pd.DataFrame) -> int:
     # Read CSV; avoid dtype guessing for CIK
     df_raw = df_in  
 
-    # Clean and validate
-    df, notes = _clean_cik_column(df_raw)
-    df = _coerce_required_strings(df)
-    df = _trim_to_limits(df)
+    # Route what can't go into securities to securities_unresolved, with a reason
+    df_raw, unresolved = split_resolved(df_raw, today)
+    print(f"Unresolved listings: {len(unresolved)}"
+          + "".join(f", {k} {v}" for k, v in unresolved["reason"].value_counts().items()))
+
+    # Clean and validate against SECURITIES_SCHEMA in one pass
+    df, rejected = coerce(df_raw.rename(columns={"symbol": "ticker", "security_name": "name"}),
+                          SECURITIES_SCHEMA)
+    notes = f"{len(rejected)} rows rejected ({reason_counts(rejected)})." if len(rejected) else ""
+    if notes:
+        print(notes)
+
+    # Share classes can map to one CIK; the row-by-row upsert always ended on
+    # the last one, so keep that
+    df = df.drop_duplicates(subset=["cik"], keep="last")
+    snap = df[SNAPSHOT_COLS].reset_index(drop=True)
+
+    # Only added/changed rows need the full upsert; the rest get a last_seen bump
+    prev_path = latest_previous_snapshot()
+    diff = diff_snapshots(prev_path, snap, key="cik")
+    unchanged = [int(c) for c in diff["unchanged"]["cik"]]
+    df = pd.concat([diff["added"], diff["changed"]], ignore_index=True)
+    print(f"Securities vs {os.path.basename(prev_path) or 'no snapshot'}: "
+          f"added={len(diff['added'])} changed={len(diff['changed'])} "
+          f"unchanged={len(unchanged)} removed={len(diff['removed'])}")
 
     # Add dates
     df["first_seen"] = today
@@ -145,8 +195,22 @@ def db_update(df_in: pd.DataFrame) -> int:
             return 409
         try:
             ensure_schema(conn)
-            dataframe_upsert(conn, df, upsertSQL=UPSERT_SQL, chunk_size=1000)
-            
+            bumped, missing = bump_last_seen(conn, unchanged, today)
+            if missing:
+                # snapshot is ahead of the table; write those rows in full
+                print(f"{len(missing)} unchanged CIKs missing from securities; upserting them")
+                extra = snap.loc[snap["cik"].isin(missing)].assign(first_seen=today, last_seen=today)
+                df = pd.concat([df, extra], ignore_index=True)
+            inserted, updated = bulk_merge(conn, df, "securities", MERGE_SECURITIES,
+                                           columns=SNAPSHOT_COLS + ["first_seen", "last_seen"])
+            # same transaction: a failed securities load doesn't leave the
+            # unresolved table describing a run that never happened
+            u_ins, u_upd = upsert_unresolved(conn, unresolved)
+            pruned = conn.execute(text(PRUNE_UNRESOLVED)).rowcount
+            notes = " ".join(filter(None, [notes, f"inserted={inserted} updated={updated} "
+                                                  f"last_seen_bumped={bumped} unresolved={len(unresolved)} "
+                                                  f"(new {u_ins}, updated {u_upd}, resolved {pruned})"]))
+
 
         finally:
             t1 = datetime.now()
@@ -161,8 +225,49 @@ def db_update(df_in: pd.DataFrame) -> int:
                     )
             release_lock(conn)
 
-    
-
+    # only after the commit, so a failed load is diffed against the old snapshot again
+    write_snapshot(snap, datetime.now())
 
     return 200
 
+
+def recheck_unresolved(sec: pd.DataFrame | None = None) -> int:
+    """
+    Re-match only the MISSING_CIK rows of securities_unresolved against a
+    (fresh) SEC ticker map and move the ones that now resolve into
+    securities. Returns how many moved.
+    """
+    if sec is None:
+        sec = load_sec_company_tickers()
+    today = date.today()
+
+    with engine.begin() as conn:
+        if not acquire_lock(conn):
+            print("Another run is holding the lock; exiting.")
+            return 0
+        try:
+            ensure_schema(conn)
+            conn.execute(text(CREATE_UNRESOLVED))
+            pending = pd.DataFrame(conn.execute(text(SELECT_UNRESOLVED_MISSING_CIK)).mappings().all(),
+                                   columns=["id", "ticker", "name", "exchange", "symbol_yf", "first_seen"])
+            hit = pending.merge(sec, on="ticker", how="inner")
+            hit = hit.loc[hit["cik"].notna()]
+            print(f"Rechecking {len(pending)} unresolved listings: {len(hit)} now have a CIK")
+            if hit.empty:
+                return 0
+
+            # id rides along so only rows that actually get merged leave the table
+            rows, rejected = coerce(hit, SECURITIES_SCHEMA + [Column("first_seen", pa.date32(), nullable=False),
+                                                              Column("id", pa.int64(), nullable=False)])
+            if len(rejected):
+                print(f"{len(rejected)} rechecked rows rejected ({reason_counts(rejected)}); left unresolved")
+            rows = rows.assign(last_seen=today).drop_duplicates(subset=["cik"], keep="last")
+            if rows.empty:
+                return 0
+            inserted, updated = bulk_merge(conn, rows, "securities", MERGE_SECURITIES,
+                                           columns=SNAPSHOT_COLS + ["first_seen", "last_seen"])
+            conn.execute(text(DELETE_UNRESOLVED_IDS), {"ids": [int(i) for i in rows["id"]]})
+            print(f"Moved {len(rows)} listings to securities (inserted {inserted}, updated {updated})")
+            return len(rows)
+        finally:
+            release_lock(conn)
@@ -0,0 +1,106 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+@dataclass
+class Task:
+    """One pipeline step. `fn` gets the results of `deps` as keyword arguments."""
+    name: str
+    fn: Callable[..., Any]
+    deps: Sequence[str] = ()
+    start: Optional[float] = field(default=None, repr=False)
+    end: Optional[float] = field(default=None, repr=False)
+    error: Optional[BaseException] = field(default=None, repr=False)
+
+    @property
+    def seconds(self) -> float:
+        return (self.end or 0.0) - (self.start or 0.0)
+
+
+class DagFailed(RuntimeError):
+    def __init__(self, failed: Dict[str, BaseException], skipped: List[str]):
+        super().__init__(f"failed: {', '.join(failed)}; skipped: {', '.join(skipped) or '-'}")
+        self.failed = failed
+        self.skipped = skipped
+
+
+def run_dag(tasks: Sequence[Task], max_workers: int = 4) -> Dict[str, Any]:
+    """
+    Run tasks on a thread pool as soon as their dependencies finish and
+    return {name: result}. If a task raises, nothing that depends on it
+    starts; the rest of the graph still runs, then DagFailed is raised.
+    """
+    by_name = {t.name: t for t in tasks}
+    for t in tasks:
+        missing = [d for d in t.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"{t.name} depends on unknown task(s) {missing}")
+
+    results: Dict[str, Any] = {}
+    failed: Dict[str, BaseException] = {}
+    pending = list(tasks)
+    running: Dict[Future, Task] = {}
+    t0 = time.perf_counter()
+
+    def call(t: Task):
+        t.start = time.perf_counter() - t0
+        try:
+            return t.fn(**{d: results[d] for d in t.deps})
+        finally:
+            t.end = time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for t in [t for t in pending if all(d in results for d in t.deps)]:
+                pending.remove(t)
+                running[pool.submit(call, t)] = t
+            if not running:
+                break  # whatever is left can never run
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                t = running.pop(fut)
+                try:
+                    results[t.name] = fut.result()
+                except BaseException as e:
+                    t.error = e
+                    failed[t.name] = e
+
+    if failed:
+        raise DagFailed(failed, [t.name for t in pending])
+    if pending:
+        raise ValueError(f"dependency cycle among {[t.name for t in pending]}")
+    return results
+
+
+def critical_path(tasks: Sequence[Task]) -> List[Task]:
+    """
+    Chain of tasks that set the finish time: start from the task that ended
+    last and keep stepping to the dependency that finished last.
+    """
+    by_name = {t.name: t for t in tasks}
+    ran = [t for t in tasks if t.end is not None]
+    if not ran:
+        return []
+    path = [max(ran, key=lambda t: t.end)]
+    while True:
+        deps = [by_name[d] for d in path[-1].deps if by_name[d].end is not None]
+        if not deps:
+            break
+        path.append(max(deps, key=lambda t: t.end))
+    return path[::-1]
+
+
+def timing_summary(tasks: Sequence[Task]) -> str:
+    lines = ["Task timings (start -> end, duration):"]
+    for t in sorted((t for t in tasks if t.start is not None), key=lambda t: t.start):
+        flag = " FAILED" if t.error is not None else ""
+        lines.append(f"  {t.name:<22} {t.start:8.2f}s -> {t.end:8.2f}s  {t.seconds:8.2f}s{flag}")
+    path = critical_path(tasks)
+    if path:
+        wall = path[-1].end
+        busy = sum(t.seconds for t in path)
+        lines.append(f"Critical path ({wall:.2f}s wall, {busy:.2f}s in tasks): "
+                     + " -> ".join(f"{t.name} {t.seconds:.2f}s" for t in path))
+    return "\n".join(lines)
@@ -0,0 +1,194 @@
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Requests per second (and burst) per domain; a key covers the domain and
+# every subdomain, and they all share one bucket. SEC fair access is 10 req/s
+# for everything we send to sec.gov (www., data., efts. ...), not per endpoint.
+SEC_MAX_RPS = float(os.getenv("SEC_MAX_RPS", "10"))
+DEFAULT_RATES: Dict[str, Tuple[float, int]] = {
+    "sec.gov": (SEC_MAX_RPS, 1),
+    # yfinance talks to Yahoo through its own session; we only pace the calls
+    "finance.yahoo.com": (float(os.getenv("YAHOO_MAX_RPS", "5")), 1),
+}
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`. acquire() blocks for one."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, sleeping until one is available. Returns seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.throttled = 0.0
+        self.statuses: Dict[int, int] = defaultdict(int)
+
+
+class HttpClient:
+    """
+    One pooled keep-alive session for the whole process, with a token bucket
+    per rate domain (see DEFAULT_RATES), jittered exponential backoff on connection errors and
+    429/5xx (Retry-After wins when the server sends it), and per-host
+    latency counters.
+    """
+
+    def __init__(self,
+                 rates: Optional[Dict[str, Tuple[float, int]]] = None,
+                 default_rate: Tuple[float, int] = (0.0, 1),
+                 headers: Optional[Dict[str, str]] = None,
+                 pool_size: int = 16,
+                 retries: int = 3,
+                 backoff_base: float = 1.0,
+                 timeout: float = 60.0):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, HostStats] = defaultdict(HostStats)
+        self._lock = threading.Lock()
+
+    def _rate_key(self, host: str) -> str:
+        # longest matching domain, so "sec.gov" covers www./data.sec.gov and a
+        # more specific entry can still override it; unmatched hosts get their own
+        matches = [h for h in self.rates if host == h or host.endswith("." + h)]
+        return max(matches, key=len) if matches else host
+
+    def _bucket(self, host: str) -> TokenBucket:
+        key = self._rate_key(host)
+        with self._lock:
+            b = self._buckets.get(key)
+            if b is None:
+                b = self._buckets[key] = TokenBucket(*self.rates.get(key, self.default_rate))
+            return b
+
+    def pace(self, host: str):
+        """Wait for a request slot on `host` without sending anything (for third-party clients)."""
+        waited = self._bucket(host).acquire()
+        with self._lock:
+            self._stats[host].throttled += waited
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, **kw) -> requests.Response:
+        host = urlsplit(url).hostname or ""
+        retries = self.retries if retries is None else retries
+        kw.setdefault("timeout", self.timeout)
+        for attempt in range(retries + 1):
+            self.pace(host)
+            t0 = time.perf_counter()
+            try:
+                r = self.session.request(method, url, **kw)
+            except requests.RequestException:
+                self._record(host, time.perf_counter() - t0, None, attempt)
+                if attempt == retries:
+                    raise
+                time.sleep(backoff_delay(attempt, self.backoff_base))
+                continue
+            self._record(host, time.perf_counter() - t0, r.status_code, attempt)
+            if r.status_code not in RETRY_STATUSES or attempt == retries:
+                return r
+            delay = _retry_after(r) or backoff_delay(attempt, self.backoff_base)
+            r.close()
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, **kw) -> requests.Response:
+        return self.request("GET", url, **kw)
+
+    def head(self, url: str, **kw) -> requests.Response:
+        kw.setdefault("allow_redirects", True)
+        return self.request("HEAD", url, **kw)
+
+    def _record(self, host: str, seconds: float, status: Optional[int], attempt: int):
+        with self._lock:
+            s = self._stats[host]
+            s.requests += 1
+            s.retries += attempt > 0
+            s.seconds += seconds
+            s.max_seconds = max(s.max_seconds, seconds)
+            if status is None:
+                s.errors += 1
+            else:
+                s.statuses[status] += 1
+
+    def stats(self) -> Dict[str, HostStats]:
+        with self._lock:
+            return dict(self._stats)
+
+    def report(self, hosts: Optional[Iterable[str]] = None) -> str:
+        lines = ["HTTP per host:"]
+        for host, s in sorted(self.stats().items()):
+            if hosts is not None and host not in hosts:
+                continue
+            avg = s.seconds / s.requests if s.requests else 0.0
+            codes = ",".join(f"{k}x{v}" for k, v in sorted(s.statuses.items()))
+            lines.append(f"  {host}: {s.requests} req | avg {avg * 1000:.0f}ms | max {s.max_seconds * 1000:.0f}ms | "
+                         f"retries {s.retries} | errors {s.errors} | throttled {s.throttled:.1f}s | {codes or '-'}")
+        return "\n".join(lines)
+
+
+def _retry_after(r: requests.Response) -> Optional[float]:
+    v = r.headers.get("Retry-After")
+    try:
+        return min(float(v), 120.0) if v is not None else None
+    except ValueError:
+        return None
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """The process-wide client every ETL network call goes through."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -1,4 +1,22 @@
 from typing import Tuple
+
+
+def unit_factor(unit: str) -> Tuple[float, str]:
+    """Multiplier and normalized label for a raw XBRL unit (e.g. USDm -> 1e6, USD)."""
+    if unit and isinstance(unit, str) and unit.upper().startswith("USD"):
+        suffix = unit.upper()[3:]
+        if suffix == "M" or suffix in ("MM", "MN"):
+            return 1_000_000, "USD"
+        elif suffix in ("B", "BN"):
+            return 1_000_000_000, "USD"
+        elif suffix in ("TH", "THS", "THOUSANDS"):
+            return 1_000, "USD"
+        return 1, "USD"
+    elif unit and unit.lower() in ("shares", "shrs"):
+        return 1, "shares"
+    return 1, unit
+
+
 def normalize_value_unit(value, unit: str) -> Tuple[float | None, str]:
     if value is None:
         return None, unit
@@ -7,19 +25,9 @@ def normalize_value_unit(value, unit: str) -> Tuple[float | None, str]:
     except Exception:
         return None, unit
 
-    unit_norm = unit
-    if unit and isinstance(unit, str) and unit.upper().startswith("USD"):
-        suffix = unit.upper()[3:]
-        if suffix == "M" or suffix in ("MM", "MN"):
-            v *= 1_000_000
-        elif suffix in ("B", "BN"):
-            v *= 1_000_000_000
-        elif suffix in ("TH", "THS", "THOUSANDS"):
-            v *= 1_000
-        unit_norm = "USD"
-    elif unit and unit.lower() in ("shares", "shrs"):
-        unit_norm = "shares"
+    factor, unit_norm = unit_factor(unit)
+    if factor != 1:
+        v *= factor
 
     return v, unit_norm
 
-
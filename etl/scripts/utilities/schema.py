@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple, TypeVar
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+@dataclass(frozen=True)
+class Column:
+    """
+    One column of a load schema. Values are coerced to `type`; a row is
+    rejected when a value can't be coerced, is null in a non-nullable
+    column, falls outside [min, max], or is longer than max_len (unless
+    truncate, which cuts it instead). Text is whitespace-trimmed unless
+    strip=False; `clean` is a regex whose matches are removed from text
+    before it's parsed as a number (e.g. r"\\D" for CIKs).
+    """
+    name: str
+    type: pa.DataType
+    nullable: bool = True
+    max_len: Optional[int] = None
+    truncate: bool = False
+    min: Optional[float] = None
+    max: Optional[float] = None
+    clean: Optional[str] = None
+    strip: bool = True
+
+
+Data = TypeVar("Data", pd.DataFrame, pa.Table, pa.RecordBatch)
+
+_INT = r"^[+-]?\d+$"
+_FLOAT = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+
+
+def _to_arrow(data, names: Sequence[str]) -> pa.Table | pa.RecordBatch:
+    """Just the `names` columns of data as Arrow; the rest are never converted."""
+    have = data.column_names if isinstance(data, (pa.Table, pa.RecordBatch)) else data.columns
+    missing = [n for n in names if n not in have]
+    if missing:
+        raise ValueError(f"missing required columns: {missing}")
+    if isinstance(data, (pa.Table, pa.RecordBatch)):
+        return data.select(list(names))
+    arrays = {}
+    for c in names:
+        try:
+            arrays[c] = pa.array(data[c], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # mixed object column (ints and strings...): go through text
+            arrays[c] = pa.array(data[c].astype("string"), from_pandas=True)
+    return pa.table(arrays) if arrays else pa.table({})
+
+
+def _is_text(t: pa.DataType) -> bool:
+    return pa.types.is_string(t) or pa.types.is_large_string(t)
+
+
+def _parse_text(arr: pa.Array, col: Column) -> pa.Array:
+    """String -> col.type. Anything that doesn't parse comes back null."""
+    s = pc.utf8_trim_whitespace(arr) if col.strip else arr
+    if _is_text(col.type):
+        return pc.cast(s, col.type)
+    if pa.types.is_integer(col.type) or pa.types.is_floating(col.type):
+        if pa.types.is_integer(col.type):
+            s = pc.replace_substring_regex(s, r"\.0+$", "")  # "1374310.0" from spreadsheets
+        if col.clean:
+            s = pc.replace_substring_regex(s, col.clean, "")
+        ok = pc.match_substring_regex(s, _INT if pa.types.is_integer(col.type) else _FLOAT)
+        return pc.cast(pc.if_else(ok, s, None), col.type)
+    if pa.types.is_date(col.type):
+        ts = pc.strptime(pc.utf8_slice_codeunits(s, 0, 10), format="%Y-%m-%d", unit="s", error_is_null=True)
+        return pc.cast(ts, col.type)
+    return pc.cast(s, col.type)
+
+
+def _coerce_array(arr: pa.Array, col: Column) -> pa.Array:
+    if arr.type == col.type and not (col.strip and _is_text(arr.type)):
+        return arr
+    if pa.types.is_null(arr.type):
+        return pa.nulls(len(arr), col.type)
+    if _is_text(arr.type):
+        return _parse_text(arr, col)
+    if _is_text(col.type):
+        return pc.cast(arr, col.type)
+    if pa.types.is_floating(arr.type) and pa.types.is_integer(col.type):
+        # 1374310.0 is fine, 1374310.5 is not
+        whole = pc.equal(arr, pc.floor(arr))
+        return pc.cast(pc.if_else(whole, arr, None), col.type, safe=False)
+    if pa.types.is_timestamp(arr.type) and pa.types.is_date(col.type):
+        return pc.cast(arr, col.type)
+    try:
+        return pc.cast(arr, col.type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return _parse_text(pc.cast(arr, pa.string()), col)
+
+
+def apply_schema(data, columns: Sequence[Column]) -> Tuple[pa.RecordBatch, pa.Array]:
+    """
+    Coerce every column of `columns` on all rows and return the coerced
+    batch (schema columns only, schema order) with a reason per row: null
+    where the row is fine, else the first failing check, e.g.
+    "cik: out of range".
+    """
+    table = _to_arrow(data, [c.name for c in columns])
+
+    n = table.num_rows
+    reason = pa.nulls(n, pa.string())
+
+    def flag(bad, label: str):
+        nonlocal reason
+        reason = pc.if_else(pc.and_(pc.is_null(reason), pc.fill_null(bad, False)), label, reason)
+
+    out = []
+    for col in columns:
+        src = table.column(col.name)
+        if isinstance(src, pa.ChunkedArray):
+            src = src.combine_chunks()
+        arr = _coerce_array(src, col)
+        if arr.null_count > src.null_count:
+            flag(pc.and_(pc.is_valid(src), pc.is_null(arr)), f"{col.name}: not a valid {col.type}")
+        if not col.nullable and arr.null_count:
+            flag(pc.is_null(arr), f"{col.name}: null")
+        if col.max_len is not None:
+            too_long = pc.greater(pc.utf8_length(arr), col.max_len)
+            if col.truncate:
+                arr = pc.utf8_slice_codeunits(arr, 0, col.max_len)
+            else:
+                flag(too_long, f"{col.name}: longer than {col.max_len}")
+        if col.min is not None:
+            flag(pc.less(arr, col.min), f"{col.name}: out of range")
+        if col.max is not None:
+            flag(pc.greater(arr, col.max), f"{col.name}: out of range")
+        out.append(arr)
+
+    return pa.RecordBatch.from_arrays(out, names=[c.name for c in columns]), reason
+
+
+def coerce(data: Data, columns: Sequence[Column]) -> Tuple[Data, Data]:
+    """
+    Validate and coerce `data` against `columns` in one vectorized pass.
+    Returns the clean rows and the rejected input rows with a `reason`
+    column, both the same kind as the input (DataFrame, Table or RecordBatch).
+    """
+    batch, reason = apply_schema(data, columns)
+    ok = pc.is_null(reason)
+    clean = batch.filter(ok) if reason.null_count < len(reason) else batch
+    if isinstance(data, pd.DataFrame):
+        # Arrow-backed like the parsed listings (ints stay ints with nulls),
+        # on the input's index so clean and rejected rows line up with it
+        index = data.index if len(clean) == len(data) else data.index[ok.to_numpy(zero_copy_only=False)]
+        clean = clean.to_pandas(types_mapper=pd.ArrowDtype).set_axis(index)
+    elif isinstance(data, pa.Table):
+        clean = pa.Table.from_batches([clean])
+
+    if reason.null_count == len(reason):
+        if isinstance(data, pd.DataFrame):
+            return clean, data.iloc[0:0].assign(reason=pd.Series(dtype="string"))
+        return clean, data.slice(0, 0).append_column("reason", pa.array([], pa.string()))
+
+    bad = pc.invert(ok)
+    if isinstance(data, pd.DataFrame):
+        mask = bad.to_numpy(zero_copy_only=False)
+        return clean, data.loc[mask].assign(reason=reason.filter(bad).to_pandas().to_numpy())
+    return clean, data.filter(bad).append_column("reason", reason.filter(bad))
+
+
+def required_positions(columns: Sequence[Column], names: Sequence[str]) -> Tuple[int, ...]:
+    """Positions in `names` of the non-nullable columns, for checking plain row tuples."""
+    return tuple(names.index(c.name) for c in columns if not c.nullable)
+
+
+def reason_counts(rejected) -> str:
+    """'cik: null 3, ticker: null 1' style summary for logs."""
+    reasons = pa.array(rejected["reason"]) if isinstance(rejected, pd.DataFrame) else rejected.column("reason")
+    counts = pc.value_counts(reasons).to_pylist()
+    return ", ".join(f"{c['values']} {c['counts']}" for c in sorted(counts, key=lambda c: -c["counts"]))
@@ -1,4 +1,12 @@
+import secrets
+from io import BytesIO
+from typing import Sequence, Tuple
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import psycopg
+from psycopg import sql
 from sqlalchemy import text
 
 
@@ -10,4 +18,57 @@ def dataframe_upsert(conn, df: pd.DataFrame, upsertSQL, chunk_size: int = 2000):
     records = df.to_dict(orient="records")
     n = len(records)
     for start in range(0, n, chunk_size):
-        upsert_chunk(conn, records[start:start + chunk_size], upsertSQL=upsertSQL)
\ No newline at end of file
+        upsert_chunk(conn, records[start:start + chunk_size], upsertSQL=upsertSQL)
+
+
+def _driver_connection(conn) -> psycopg.Connection:
+    # SQLAlchemy Connection -> the psycopg connection under it (same transaction)
+    if isinstance(conn, psycopg.Connection):
+        return conn
+    return conn.connection.driver_connection
+
+
+def bulk_merge(conn,
+               data: pd.DataFrame | pa.Table,
+               target: str,
+               merge_sql: str,
+               columns: Sequence[str] | None = None) -> Tuple[int, int]:
+    """
+    COPY `data` into a temp table shaped like `columns` of `target`, then run
+    merge_sql once and return (inserted, updated).
+
+    merge_sql is an INSERT ... SELECT ... FROM {staging} ... ON CONFLICT
+    statement without RETURNING; {staging} is filled in here. Like any single
+    INSERT ... ON CONFLICT, it can't touch the same key twice, so dedupe
+    first. Works on a SQLAlchemy or psycopg connection and does not commit.
+    """
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    if columns is not None:
+        table = table.select(list(columns))
+    cols = sql.SQL(", ").join(sql.Identifier(c) for c in table.column_names)
+    staging = sql.Identifier(f"_merge_{target}_{secrets.token_hex(4)}")
+
+    raw = _driver_connection(conn)
+    with raw.cursor() as cur:
+        # same column types as the target, none of its constraints or defaults
+        cur.execute(sql.SQL("CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                            "SELECT {cols} FROM {target} WITH NO DATA").format(
+            staging=staging, cols=cols, target=sql.Identifier(target)))
+
+        # Arrow's CSV writer encodes each batch in C++: no per-row Python objects
+        opts = pa_csv.WriteOptions(include_header=False)
+        with cur.copy(sql.SQL("COPY {staging} ({cols}) FROM STDIN WITH (FORMAT csv)").format(
+                staging=staging, cols=cols)) as cp:
+            for batch in table.to_batches(max_chunksize=64_000):
+                buf = BytesIO()
+                pa_csv.write_csv(batch, buf, opts)
+                cp.write(buf.getbuffer())
+
+        # xmax = 0 on the returned row means it was inserted, not updated;
+        # count in the server so only two numbers come back
+        cur.execute(sql.SQL("WITH m AS ({merge} RETURNING (xmax = 0) AS inserted) "
+                            "SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) "
+                            "FROM m").format(merge=sql.SQL(merge_sql.strip().rstrip(";")).format(staging=staging)))
+        inserted, updated = cur.fetchone()
+        cur.execute(sql.SQL("DROP TABLE {staging}").format(staging=staging))
+    return int(inserted), int(updated)
@@ -1,5 +1,12 @@
 from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import mmap
+import struct
 import zipfile
+import zlib
+
+import numpy as np
 
 @contextmanager
 def open_zip(path: str):
@@ -7,4 +14,212 @@ def open_zip(path: str):
     try:
         yield zf
     finally:
-        zf.close()
\ No newline at end of file
+        zf.close()
+
+
+# -----------------------------
+# mmap-backed reader
+# -----------------------------
+
+_EOCD = struct.Struct("<4s4H2LH")            # end of central directory
+_EOCD64_LOC = struct.Struct("<4sLQL")        # zip64 EOCD locator
+_EOCD64 = struct.Struct("<4sQ2H2L4Q")        # zip64 EOCD record
+_CDIR = struct.Struct("<4s6H3L5H2L")         # central directory file header
+_LOCAL = struct.Struct("<4s5H3L2H")          # local file header
+
+_SIG_EOCD = b"PK\x05\x06"
+_SIG_EOCD64_LOC = b"PK\x06\x07"
+_SIG_EOCD64 = b"PK\x06\x06"
+_SIG_CDIR = b"PK\x01\x02"
+_SIG_LOCAL = b"PK\x03\x04"
+
+STORED, DEFLATED = 0, 8
+
+
+class ZipIndex(NamedTuple):
+    """Central directory as parallel arrays; cheap to pickle into worker processes."""
+    names: List[str]
+    offset: np.ndarray      # int64, local header offset
+    csize: np.ndarray       # int64, compressed size
+    usize: np.ndarray       # int64, uncompressed size
+    crc: np.ndarray         # uint32
+    method: np.ndarray      # uint16
+    dostime: np.ndarray     # uint32, (date << 16) | time
+
+
+def _find_eocd(mm: mmap.mmap) -> int:
+    # EOCD sits in the last 22 bytes plus up to 64 KiB of comment
+    start = max(0, len(mm) - (_EOCD.size + 0xFFFF))
+    pos = mm.rfind(_SIG_EOCD, start)
+    if pos < 0:
+        raise zipfile.BadZipFile("end of central directory not found")
+    return pos
+
+
+def _read_index(mm: mmap.mmap) -> ZipIndex:
+    eocd = _find_eocd(mm)
+    _, _, _, _, count, cd_size, cd_offset, _ = _EOCD.unpack_from(mm, eocd)
+
+    loc = eocd - _EOCD64_LOC.size
+    if loc >= 0 and mm[loc:loc + 4] == _SIG_EOCD64_LOC:
+        _, _, eocd64, _ = _EOCD64_LOC.unpack_from(mm, loc)
+        rec = _EOCD64.unpack_from(mm, eocd64)
+        if rec[0] != _SIG_EOCD64:
+            raise zipfile.BadZipFile("bad zip64 end of central directory")
+        count, cd_size, cd_offset = rec[7], rec[8], rec[9]
+
+    names: List[str] = []
+    offset = np.empty(count, np.int64)
+    csize = np.empty(count, np.int64)
+    usize = np.empty(count, np.int64)
+    crc = np.empty(count, np.uint32)
+    method = np.empty(count, np.uint16)
+    dostime = np.empty(count, np.uint32)
+
+    p = cd_offset
+    for i in range(count):
+        (sig, _, _, flags, meth, t, d, c, cs, us,
+         nlen, xlen, clen, _, _, _, off) = _CDIR.unpack_from(mm, p)
+        if sig != _SIG_CDIR:
+            raise zipfile.BadZipFile(f"bad central directory entry {i}")
+        p += _CDIR.size
+        raw_name = mm[p:p + nlen]
+        names.append(raw_name.decode("utf-8" if flags & 0x800 else "cp437"))
+        if 0xFFFFFFFF in (cs, us, off):
+            us, cs, off = _zip64_sizes(mm, p + nlen, xlen, us, cs, off)
+        if flags & 0x1:
+            raise zipfile.BadZipFile(f"{names[-1]} is encrypted")
+        offset[i], csize[i], usize[i] = off, cs, us
+        crc[i], method[i], dostime[i] = c, meth, (d << 16) | t
+        p += nlen + xlen + clen
+
+    return ZipIndex(names, offset, csize, usize, crc, method, dostime)
+
+
+def _zip64_sizes(mm: mmap.mmap, p: int, xlen: int, us: int, cs: int, off: int) -> Tuple[int, int, int]:
+    # zip64 extra field (0x0001) lists only the fields that overflowed, in this order
+    end = p + xlen
+    while p + 4 <= end:
+        tag, size = struct.unpack_from("<2H", mm, p)
+        if tag == 0x0001:
+            q = p + 4
+            if us == 0xFFFFFFFF:
+                us = struct.unpack_from("<Q", mm, q)[0]; q += 8
+            if cs == 0xFFFFFFFF:
+                cs = struct.unpack_from("<Q", mm, q)[0]; q += 8
+            if off == 0xFFFFFFFF:
+                off = struct.unpack_from("<Q", mm, q)[0]
+            break
+        p += 4 + size
+    return us, cs, off
+
+
+class MappedZip:
+    """
+    Read-only zip reader over an mmap of the whole archive. The central
+    directory is parsed once into a ZipIndex; pass that index to other
+    processes' MappedZip so they skip re-parsing it. Compressed bytes are
+    read straight out of the mapping (no file reads or zipfile stream
+    layers), deflated members are inflated in one call into a buffer of
+    the exact final size, and every member is CRC-checked.
+    """
+
+    def __init__(self, path: str, index: Optional[ZipIndex] = None):
+        self.path = path
+        self._fp = open(path, "rb")
+        self._mm = None
+        # anything failing here (empty file, no EOCD, bad directory entry)
+        # must not leave the file mapped: callers delete bad downloads next
+        try:
+            self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+            if index is None:
+                try:
+                    index = _read_index(self._mm)
+                except struct.error as e:
+                    raise zipfile.BadZipFile(f"truncated central directory: {e}") from e
+        except BaseException:
+            self.close()
+            raise
+        self.index = index
+        self._pos: Dict[str, int] = {n: i for i, n in enumerate(self.index.names)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._fp.close()
+
+    def __len__(self):
+        return len(self.index.names)
+
+    def namelist(self) -> List[str]:
+        return self.index.names
+
+    def position(self, name: str) -> int:
+        try:
+            return self._pos[name]
+        except KeyError:
+            raise KeyError(f"no member named {name!r}") from None
+
+    def file_size(self, i: int) -> int:
+        return int(self.index.usize[i])
+
+    def crc(self, i: int) -> int:
+        return int(self.index.crc[i])
+
+    def date_time(self, i: int) -> datetime:
+        # same naive local time zipfile.ZipInfo.date_time describes
+        v = int(self.index.dostime[i])
+        d, t = v >> 16, v & 0xFFFF
+        return datetime(1980 + (d >> 9), (d >> 5) & 0xF, d & 0x1F, t >> 11, (t >> 5) & 0x3F, (t & 0x1F) * 2)
+
+    def _data_view(self, i: int) -> memoryview:
+        off = int(self.index.offset[i])
+        sig, *_, nlen, xlen = _LOCAL.unpack_from(self._mm, off)
+        if sig != _SIG_LOCAL:
+            raise zipfile.BadZipFile(f"bad local header for {self.index.names[i]}")
+        start = off + _LOCAL.size + nlen + xlen
+        return memoryview(self._mm)[start:start + int(self.index.csize[i])]
+
+    def read(self, name: str) -> bytes:
+        return self.read_at(self.position(name))
+
+    def read_at(self, i: int) -> bytes:
+        meth = int(self.index.method[i])
+        usize = int(self.index.usize[i])
+        with self._data_view(i) as data:
+            if meth == STORED:
+                out = bytes(data)
+            elif meth == DEFLATED:
+                out = zlib.decompress(data, -15, max(usize, 1))
+            else:
+                raise NotImplementedError(f"compression method {meth} in {self.index.names[i]}")
+        if len(out) != usize or zlib.crc32(out) != int(self.index.crc[i]):
+            raise zipfile.BadZipFile(f"bad CRC/size for {self.index.names[i]}")
+        return out
+
+    def check(self, deep: bool = False):
+        """
+        Raise BadZipFile unless every member's local header is where the
+        central directory says and its data ends inside the file. That alone
+        catches a truncated or spliced download; deep=True also inflates and
+        CRC-checks every member.
+        """
+        size = len(self._mm)
+        for i in range(len(self)):
+            off = int(self.index.offset[i])
+            if off + _LOCAL.size > size:
+                raise zipfile.BadZipFile(f"{self.index.names[i]} starts past the end of the archive")
+            sig, *_, nlen, xlen = _LOCAL.unpack_from(self._mm, off)
+            if sig != _SIG_LOCAL:
+                raise zipfile.BadZipFile(f"bad local header for {self.index.names[i]}")
+            if off + _LOCAL.size + nlen + xlen + int(self.index.csize[i]) > size:
+                raise zipfile.BadZipFile(f"{self.index.names[i]} runs past the end of the archive")
+            if deep:
+                self.read_at(i)
@@ -16,14 +16,16 @@ CREATE TABLE IF NOT EXISTS fundamentals_raw (
 );
 """
 
-DDL_STAGING = """
-CREATE TABLE IF NOT EXISTS staging_fundamentals (
+# Each load session stages into its own table so concurrent loaders can't
+# truncate each other's rows. {kind} is TEMP or UNLOGGED; neither writes WAL.
+DDL_SESSION_STAGING = """
+CREATE {kind} TABLE {staging} (
   cik           BIGINT,
   accession_no  TEXT,
   fiscal_year   INT,
   fiscal_period TEXT,
   tag           TEXT,
-  value         NUMERIC,
+  value         DOUBLE PRECISION,
   unit          TEXT,
   frame         TEXT,
   filing_date   DATE,
@@ -31,19 +33,30 @@ CREATE TABLE IF NOT EXISTS staging_fundamentals (
 );
 """
 
+# Optional: mirrors the fundamentals_raw key so the merge can use it
+CREATE_STAGING_INDEX = """
+CREATE INDEX {index} ON {staging} (cik, accession_no, tag, (COALESCE(frame, '__NOFRAME__')));
+"""
+
+ANALYZE_STAGING = "ANALYZE {staging};"
+
+DROP_STAGING_INDEX = "DROP INDEX IF EXISTS {index};"
+
 UPSERT_FROM_STAGING = """
 INSERT INTO fundamentals_raw
   (cik, accession_no, fiscal_year, fiscal_period,
    tag, value, unit, frame, filing_date, source_file)
 SELECT s.cik, s.accession_no, s.fiscal_year, s.fiscal_period,
-       s.tag, s.value, s.unit,
+       s.tag, s.value::text::numeric, s.unit,  -- via text: a direct float8 cast keeps only 15 digits
        COALESCE(s.frame, '__NOFRAME__') AS frame,
        s.filing_date, s.source_file
-FROM staging_fundamentals s
+FROM {staging} s
 ON CONFLICT (cik, accession_no, tag, frame) DO NOTHING;
 """
 
-TRUNCATE_STAGING = "TRUNCATE staging_fundamentals;"
+TRUNCATE_STAGING = "TRUNCATE {staging};"
+
+DROP_STAGING = "DROP TABLE IF EXISTS {staging};"
 
 LEDGER_SELECT = """
 SELECT source_kind, natural_key, asset_path, byte_size, crc32, sha256, last_modified, etag, processed_at, status
@@ -65,4 +78,77 @@ SET asset_path    = EXCLUDED.asset_path,
     etag          = EXCLUDED.etag,
     processed_at  = now(),
     status        = EXCLUDED.status
-"""
\ No newline at end of file
+"""
+
+# Bulk ledger API: candidate metas are COPYed into a per-connection temp
+# table and joined, instead of inlining every key into the statement.
+LEDGER_BATCH_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS _ledger_batch (
+  natural_key   TEXT,
+  asset_path    TEXT,
+  byte_size     BIGINT,
+  crc32         BIGINT,
+  sha256        TEXT,
+  last_modified TIMESTAMPTZ,
+  etag          TEXT
+) ON COMMIT DELETE ROWS;
+"""
+
+LEDGER_BATCH_COPY = """
+COPY _ledger_batch (natural_key, asset_path, byte_size, crc32, sha256, last_modified, etag)
+FROM STDIN WITH (FORMAT binary)
+"""
+
+LEDGER_BATCH_SELECT = """
+SELECT l.source_kind, l.natural_key, l.asset_path, l.byte_size, l.crc32, l.sha256,
+       l.last_modified, l.etag, l.processed_at, l.status
+FROM _ledger_batch b
+JOIN etl_source_ledger l ON l.source_kind = %(source_kind)s AND l.natural_key = b.natural_key
+"""
+
+# Candidates with no ledger row or a different zip fingerprint, plus the
+# prior sha256 so callers can compare content hashes
+LEDGER_BATCH_CHANGED = """
+SELECT b.natural_key, l.sha256
+FROM _ledger_batch b
+LEFT JOIN etl_source_ledger l ON l.source_kind = %(source_kind)s AND l.natural_key = b.natural_key
+WHERE l.natural_key IS NULL
+   OR b.asset_path    IS DISTINCT FROM l.asset_path
+   OR b.byte_size     IS DISTINCT FROM l.byte_size
+   OR b.crc32         IS DISTINCT FROM l.crc32
+   OR b.last_modified IS DISTINCT FROM l.last_modified
+"""
+
+# Unchanged candidates stamped after `since` (NULL = any stamp)
+LEDGER_BATCH_RESUMED = """
+SELECT count(*)
+FROM _ledger_batch b
+JOIN etl_source_ledger l ON l.source_kind = %(source_kind)s AND l.natural_key = b.natural_key
+WHERE b.asset_path    IS NOT DISTINCT FROM l.asset_path
+  AND b.byte_size     IS NOT DISTINCT FROM l.byte_size
+  AND b.crc32         IS NOT DISTINCT FROM l.crc32
+  AND b.last_modified IS NOT DISTINCT FROM l.last_modified
+  AND l.processed_at IS NOT NULL
+  AND (%(since)s::timestamptz IS NULL OR l.processed_at > %(since)s::timestamptz)
+"""
+
+LEDGER_BATCH_UPSERT = """
+INSERT INTO etl_source_ledger
+  (source_kind, natural_key, asset_path, byte_size, crc32, sha256, last_modified, etag, processed_at, status)
+SELECT %(source_kind)s, b.natural_key, b.asset_path, b.byte_size, b.crc32, b.sha256,
+       b.last_modified, b.etag, now(), %(status)s
+FROM _ledger_batch b
+ON CONFLICT (source_kind, natural_key) DO UPDATE
+SET asset_path    = EXCLUDED.asset_path,
+    byte_size     = EXCLUDED.byte_size,
+    crc32         = EXCLUDED.crc32,
+    sha256        = EXCLUDED.sha256,
+    last_modified = EXCLUDED.last_modified,
+    etag          = EXCLUDED.etag,
+    processed_at  = now(),
+    status        = EXCLUDED.status
+"""
+
+LEDGER_BATCH_CLEAR = "TRUNCATE _ledger_batch;"
+
+LEDGER_BATCH_ANALYZE = "ANALYZE _ledger_batch;"
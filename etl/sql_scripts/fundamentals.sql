@@ -1,16 +1,5 @@
--- Fundamentals staging table
-CREATE TABLE IF NOT EXISTS staging_fundamentals (
-  cik           BIGINT,
-  accession_no  TEXT,
-  fiscal_year   INT,
-  fiscal_period TEXT,
-  tag           TEXT,
-  value         NUMERIC,
-  unit          TEXT,
-  frame         TEXT,
-  filing_date   DATE,
-  source_file   TEXT
-);
+-- Staging tables are per load session (TEMP or UNLOGGED), created by the
+-- loader from DDL_SESSION_STAGING in fundamentals.py.
 
 -- Historical, append-only-ish, deduped by filing identity
 CREATE TABLE IF NOT EXISTS fundamentals_raw (
@@ -11,3 +11,10 @@ INSERT INTO etl_logs
 VALUES
   (%(pipeline_name)s, %(time_start)s, %(time_end)s, %(status)s, %(errors)s, %(notes)s)
 """
+
+
+LAST_OK_RUN_PG = """
+SELECT max(time_end)
+FROM etl_logs
+WHERE pipeline_name = %(pipeline_name)s AND status = 'ok'
+"""
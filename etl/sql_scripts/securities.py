@@ -31,21 +31,87 @@ set
     company_name = excluded.company_name,
     symbol_yf    = excluded.symbol_yf,
     first_seen   = least(securities.first_seen, excluded.first_seen),
-    last_seen    = greatest(securities.last_seen, excluded.last_seen);
+    last_seen    = greatest(securities.last_seen, excluded.last_seen)
+-- skip no-op updates so rerunning a day doesn't leave a dead tuple per row
+where (securities.ticker, securities.name, securities.exchange, securities.company_name, securities.symbol_yf)
+      is distinct from
+      (excluded.ticker, excluded.name, excluded.exchange, excluded.company_name, excluded.symbol_yf)
+   or securities.first_seen > excluded.first_seen
+   or securities.last_seen  < excluded.last_seen;
 """
+
+# UPSERT_SQL for utilities.upsert.bulk_merge: same rules, one statement over the COPY'd rows
+MERGE_SECURITIES = """
+insert into securities(
+    cik, ticker, name, exchange, company_name, symbol_yf, first_seen, last_seen
+)
+select cik, ticker, name, exchange, company_name, symbol_yf, first_seen, last_seen
+from {staging}
+on conflict (cik) do update
+set
+    ticker       = excluded.ticker,
+    name         = excluded.name,
+    exchange     = excluded.exchange,
+    company_name = excluded.company_name,
+    symbol_yf    = excluded.symbol_yf,
+    first_seen   = least(securities.first_seen, excluded.first_seen),
+    last_seen    = greatest(securities.last_seen, excluded.last_seen)
+where (securities.ticker, securities.name, securities.exchange, securities.company_name, securities.symbol_yf)
+      is distinct from
+      (excluded.ticker, excluded.name, excluded.exchange, excluded.company_name, excluded.symbol_yf)
+   or securities.first_seen > excluded.first_seen
+   or securities.last_seen  < excluded.last_seen
+"""
+
+# Rows unchanged since the last snapshot only need last_seen moved forward.
+# `present` counts how many of :ciks exist at all, so a snapshot that's ahead
+# of the table (restore, manual delete) can be caught.
+BUMP_LAST_SEEN = """
+with bumped as (
+    update securities
+    set last_seen = :today
+    where cik = any(cast(:ciks as bigint[])) and last_seen < :today
+    returning 1
+)
+select (select count(*) from bumped) as bumped,
+       (select count(*) from securities where cik = any(cast(:ciks as bigint[]))) as present;
+"""
+
+MISSING_CIKS = """
+select c.cik
+from unnest(cast(:ciks as bigint[])) as c(cik)
+where not exists (select 1 from securities s where s.cik = c.cik);
+"""
+# ticker / symbol_yf are unbounded: LENGTH_OVERFLOW rows are here precisely
+# because they don't fit securities, and cutting them would make distinct
+# listings collide on (ticker, exchange)
 CREATE_UNRESOLVED = """
 create table if not exists securities_unresolved (
   id bigserial primary key,
-  ticker       varchar(7)  not null,
+  ticker       text        not null,
   name         varchar(80) not null,
   exchange     varchar(15) not null,
   company_name varchar(80),
-  symbol_yf    varchar(7)  not null,
+  symbol_yf    text        not null,
   first_seen   date not null,
   last_seen    date not null,
   reason       text,
   unique (ticker, exchange)
 );
+
+-- tables created with varchar(7); varchar -> text doesn't rewrite the table
+do $$
+begin
+  if exists (select 1 from information_schema.columns
+             where table_schema = current_schema()
+               and table_name = 'securities_unresolved'
+               and column_name in ('ticker', 'symbol_yf')
+               and data_type <> 'text') then
+    alter table securities_unresolved
+      alter column ticker    type text,
+      alter column symbol_yf type text;
+  end if;
+end $$;
 """
 
 UPSERT_UNRESOLVED = """
@@ -61,4 +127,45 @@ set
   symbol_yf    = excluded.symbol_yf,
   last_seen    = greatest(securities_unresolved.last_seen, excluded.last_seen),
   reason       = excluded.reason;
-"""
\ No newline at end of file
+"""
+
+MERGE_UNRESOLVED = """
+insert into securities_unresolved(
+  ticker, name, exchange, company_name, symbol_yf, first_seen, last_seen, reason
+)
+select ticker, name, exchange, company_name, symbol_yf, first_seen, last_seen, reason
+from {staging}
+on conflict (ticker, exchange) do update
+set
+  name         = excluded.name,
+  company_name = coalesce(excluded.company_name, securities_unresolved.company_name),
+  symbol_yf    = excluded.symbol_yf,
+  last_seen    = greatest(securities_unresolved.last_seen, excluded.last_seen),
+  reason       = excluded.reason
+where (securities_unresolved.name, securities_unresolved.symbol_yf, securities_unresolved.reason)
+      is distinct from (excluded.name, excluded.symbol_yf, excluded.reason)
+   or securities_unresolved.company_name is distinct from
+      coalesce(excluded.company_name, securities_unresolved.company_name)
+   or securities_unresolved.last_seen < excluded.last_seen
+"""
+
+# a listing that resolved on this run no longer belongs in the unresolved table
+PRUNE_UNRESOLVED = """
+delete from securities_unresolved u
+where exists (
+  select 1 from securities s
+  where s.ticker = u.ticker and s.exchange = u.exchange
+);
+"""
+
+# only rows a newer ticker file can fix; exclusion labels and length
+# overflows don't change with the SEC map
+SELECT_UNRESOLVED_MISSING_CIK = """
+select id, ticker, name, exchange, symbol_yf, first_seen
+from securities_unresolved
+where reason = 'MISSING_CIK';
+"""
+
+DELETE_UNRESOLVED_IDS = """
+delete from securities_unresolved where id = any(cast(:ids as bigint[]));
+"""
@@ -1,11 +1,13 @@
 import pandas as pd
 import yfinance as yf
-import time
+from etl.scripts.utilities.http import get_client
 import os
 from datetime import datetime
 
 # Configuration
 DATA_LOC = "data/"
+# yfinance requests are paced by the shared client's Yahoo token bucket
+YF_HOST = "query2.finance.yahoo.com"
 # Maps the era file to the last trading day of that "Recovery" period
 ERA_CONFIGS = {
     "crisis_era_base.csv": "2011-12-30",
@@ -44,6 +46,7 @@ def enrich_era_files():
                 end_dt = datetime.strptime(target_date, '%Y-%m-%d')
                 start_dt = end_dt.replace(day=end_dt.day - 3)
                 
+                get_client().pace(YF_HOST)
                 hist = yf.download(ticker, start=start_dt, end=end_dt, 
                                    auto_adjust=False, progress=False)
                 
@@ -52,6 +55,7 @@ def enrich_era_files():
                     new_row['hist_price'] = float(hist['Close'].values[-1])
                 # 2. Get Metadata (Sector/Beta/Yield)
                 stock = yf.Ticker(ticker)
+                get_client().pace(YF_HOST)
                 info = stock.info
                 new_row['sector'] = info.get('sector', 'Unknown')
                 new_row['beta'] = info.get('beta')
@@ -63,7 +67,6 @@ def enrich_era_files():
                 print(f"   [{counter}/{len(df_input)}] ⚠️ Failed {ticker}: {e}")
             
             enriched_data.append(new_row)
-            time.sleep(0.2) # Avoid rate limits
 
         # Finalize Era DataFrame
         df_final = pd.DataFrame(enriched_data)
@@ -1,12 +1,14 @@
 import pandas as pd
 import yfinance as yf
-import time
+from etl.scripts.utilities.http import get_client
 import os
 
 # Configuration
 DATA_LOC = "data/"
 INPUT_FILE = f"{DATA_LOC}project_base_data.csv"
 OUTPUT_FILE = f"{DATA_LOC}final_stats_project.csv"
+# yfinance requests are paced by the shared client's Yahoo token bucket
+YF_HOST = "query2.finance.yahoo.com"
 
 def enrich_with_market_data():
     if not os.path.exists(INPUT_FILE):
@@ -42,6 +44,7 @@ def enrich_with_market_data():
         try:
             # Fetch data
             stock = yf.Ticker(ticker)
+            get_client().pace(YF_HOST)
             info = stock.info
             
             # Extract
@@ -68,7 +71,6 @@ def enrich_with_market_data():
         # Append the completed dictionary to our list
         enriched_data.append(new_row)
         
-        time.sleep(0.1)
 
     print("\n🔄 Reassembling DataFrame...")
     
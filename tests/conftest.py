@@ -0,0 +1,114 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class FileServer:
+    """
+    In-process stand-in for the SEC archive: serves one body with Range,
+    ETag / Last-Modified and (optionally) conditional GET support.
+
+    `faults` maps a request number (1-based, GETs only) to "short" (answer
+    the Range, but with only half its bytes) or a status code to send
+    instead; "*" applies to every GET.
+    """
+
+    def __init__(self, body: bytes, etag: str = '"v1"', last_modified: str = "Mon, 05 Oct 2026 10:00:00 GMT"):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.conditional = True
+        self.ranges = True
+        self.faults = {}
+        self.requests = []
+        self.extra_headers = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/file.zip"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def gets(self):
+        return [r for r in self.requests if r["method"] == "GET"]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *a):
+                pass
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def _serve(self, head: bool):
+                with server._lock:
+                    server.requests.append({"method": self.command, "headers": dict(self.headers)})
+                    n = len(server.gets())
+                fault = None if head else server.faults.get(n, server.faults.get("*"))
+                if isinstance(fault, int):
+                    self.send_response(fault)
+                    for k, v in server.extra_headers.get(fault, {}).items():
+                        self.send_header(k, v)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                validators = {"ETag": server.etag, "Last-Modified": server.last_modified}
+                if server.conditional and (self.headers.get("If-None-Match") == server.etag
+                                           or self.headers.get("If-Modified-Since") == server.last_modified):
+                    self.send_response(304)
+                    for k, v in validators.items():
+                        self.send_header(k, v)
+                    self.end_headers()
+                    return
+
+                body, total = server.body, len(server.body)
+                rng = self.headers.get("Range")
+                if rng and server.ranges:
+                    a, _, b = rng.split("=", 1)[1].partition("-")
+                    start, end = int(a), min(int(b) if b else total - 1, total - 1)
+                    body = server.body[start:end + 1]
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+                else:
+                    self.send_response(200)
+                for k, v in validators.items():
+                    self.send_header(k, v)
+                if fault == "short":
+                    body = body[:len(body) // 2]
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if not head:
+                    try:
+                        self.wfile.write(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass  # client hung up after reading what it needed
+
+        return Handler
+
+
+@pytest.fixture
+def file_server():
+    servers = []
+
+    def make(body: bytes, **kw) -> FileServer:
+        s = FileServer(body, **kw)
+        servers.append(s)
+        return s
+
+    yield make
+    for s in servers:
+        s.close()
@@ -0,0 +1,85 @@
+import json
+import os
+import re
+
+import pytest
+
+from etl.scripts.fundamentals.fetch_fund import CHUNK, download_segmented
+from etl.scripts.utilities.http import HttpClient
+
+# three segments: _segments never cuts parts smaller than CHUNK
+BODY = bytes(range(256)) * ((3 * CHUNK + 1000) // 256)
+
+
+def ranges(server, since: int = 0):
+    out = []
+    for r in server.gets()[since:]:
+        a, b = re.match(r"bytes=(\d+)-(\d+)", r["headers"]["Range"]).groups()
+        out.append((int(a), int(b)))
+    return out
+
+
+def fetch(server, dest, **kw):
+    kw.setdefault("stamp", server.etag)
+    return download_segmented(server.url, str(dest), len(server.body), segments=3, connections=1,
+                              client=HttpClient(rates={}), max_retries=1, sleep_s=0.001, **kw)
+
+
+def test_segments_assemble_the_file(file_server, tmp_path):
+    srv = file_server(BODY)
+    dest = tmp_path / "f.zip"
+    fetch(srv, dest)
+    assert dest.read_bytes() == BODY
+    assert len(srv.gets()) == 3
+    assert not os.path.exists(str(dest) + ".part")
+    assert not os.path.exists(str(dest) + ".part.json")
+
+
+def test_resumes_from_progress_after_interrupted_segment(file_server, tmp_path):
+    srv = file_server(BODY)
+    dest = tmp_path / "f.zip"
+    srv.faults = {2: 500}  # second segment fails, the others finish
+    with pytest.raises(IOError):
+        fetch(srv, dest)
+    progress = json.loads((tmp_path / "f.zip.part.json").read_text())
+    assert progress["done"] == [0, 2]
+    failed = ranges(srv)[1]
+
+    n = len(srv.gets())
+    fetch(srv, dest)
+    assert ranges(srv, n) == [failed]
+    assert dest.read_bytes() == BODY
+
+
+def test_short_read_raises(file_server, tmp_path):
+    srv = file_server(BODY)
+    srv.faults = {"*": "short"}
+    with pytest.raises(IOError, match="short read"):
+        fetch(srv, tmp_path / "f.zip")
+    assert not (tmp_path / "f.zip").exists()
+
+
+def test_changed_stamp_restarts(file_server, tmp_path):
+    srv = file_server(BODY)
+    dest = tmp_path / "f.zip"
+    srv.faults = {2: 500}
+    with pytest.raises(IOError):
+        fetch(srv, dest, stamp='"v1"')
+
+    n = len(srv.gets())
+    fetch(srv, dest, stamp='"v2"')
+    assert len(ranges(srv, n)) == 3  # nothing reused from the old file
+    assert dest.read_bytes() == BODY
+
+
+def test_failed_verify_removes_part(file_server, tmp_path):
+    srv = file_server(BODY)
+    dest = tmp_path / "f.zip"
+
+    def verify(path):
+        raise ValueError("bad archive")
+
+    with pytest.raises(ValueError):
+        fetch(srv, dest, verify=verify)
+    assert not os.path.exists(str(dest) + ".part")
+    assert not dest.exists()
@@ -0,0 +1,71 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from etl.scripts.fundamentals.fetch_fund import download_zip
+from etl.scripts.utilities.http import HttpClient
+
+
+def make_zip(payload: bytes = b"x" * 1000) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as z:
+        z.writestr("CIK0000000001.json", payload)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def client():
+    return HttpClient(rates={})
+
+
+def fetch(server, dest, client):
+    return download_zip(server.url, str(dest), max_retries=1, sleep_s=0.001, segments=2, client=client)
+
+
+def test_downloads_and_writes_manifest(file_server, tmp_path, client):
+    srv = file_server(make_zip())
+    dest = tmp_path / "companyfacts.zip"
+    fetch(srv, dest, client)
+    assert dest.read_bytes() == srv.body
+    assert (tmp_path / "companyfacts.zip.json").exists()
+    assert not (tmp_path / "companyfacts.zip.part").exists()
+
+
+def test_304_skips_download(file_server, tmp_path, client):
+    srv = file_server(make_zip())
+    dest = tmp_path / "companyfacts.zip"
+    fetch(srv, dest, client)
+    n = len(srv.gets())
+
+    fetch(srv, dest, client)
+    probe = srv.gets()[n:]
+    assert len(probe) == 1
+    assert probe[0]["headers"]["If-None-Match"] == srv.etag
+
+
+def test_same_validators_skip_download_when_server_ignores_conditional(file_server, tmp_path, client):
+    srv = file_server(make_zip())
+    dest = tmp_path / "companyfacts.zip"
+    fetch(srv, dest, client)
+    mtime = os.stat(dest).st_mtime_ns
+    n = len(srv.gets())
+
+    srv.conditional = False  # answers 206 with the same ETag / Last-Modified
+    fetch(srv, dest, client)
+    assert len(srv.gets()) == n + 1  # only the probe
+    assert os.stat(dest).st_mtime_ns == mtime
+    assert not (tmp_path / "companyfacts.zip.part").exists()
+
+
+def test_changed_file_is_downloaded_again(file_server, tmp_path, client):
+    srv = file_server(make_zip())
+    dest = tmp_path / "companyfacts.zip"
+    fetch(srv, dest, client)
+
+    srv.conditional = False
+    srv.body = make_zip(b"y" * 2000)
+    srv.etag = '"v2"'
+    fetch(srv, dest, client)
+    assert dest.read_bytes() == srv.body
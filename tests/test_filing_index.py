@@ -0,0 +1,71 @@
+import os
+import zipfile
+from datetime import date
+
+import numpy as np
+import orjson
+import pytest
+
+from etl.scripts.fundamentals.filing_index import build_filing_index
+
+
+def make_submissions(path, ciks=(1, 2, 3)):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        for c in ciks:
+            recent = {"accessionNumber": [f"0000{c:06d}-24-00000{k}" for k in range(3)],
+                      "filingDate": [f"2024-0{c}-0{k + 1}" for k in range(3)]}
+            z.writestr(f"CIK{c:010d}.json", orjson.dumps({"cik": c, "filings": {"recent": recent}}))
+
+
+@pytest.fixture
+def built(tmp_path):
+    sub = tmp_path / "submissions.zip"
+    make_submissions(sub)
+    idx_dir = tmp_path / "fidx"
+    build_filing_index(str(sub), str(idx_dir))
+    return sub, idx_dir
+
+
+def expected(idx):
+    assert len(idx) == 9
+    assert idx.lookup(["0000000002-24-000001"]) == {"0000000002-24-000001": date(2024, 2, 2)}
+
+
+def test_rerun_reuses_index(built, capsys):
+    sub, idx_dir = built
+    expected(build_filing_index(str(sub), str(idx_dir)))
+    assert "0 members read" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("manifest", [
+    {"members": {}},                                          # no next_id
+    {"next_id": 3},                                           # no members
+    {"next_id": "3", "members": {}},                          # wrong type
+    {"next_id": 3, "members": []},
+    {"next_id": 3, "members": {"CIK0000000001.json": 7}},     # entry not a list
+    {"next_id": 1, "members": {"CIK0000000001.json": [5, 0, 0]}},  # id past next_id
+    [1, 2, 3],
+])
+def test_bad_manifest_rebuilds(built, capsys, manifest):
+    sub, idx_dir = built
+    (idx_dir / "manifest.json").write_bytes(orjson.dumps(manifest))
+    capsys.readouterr()
+    expected(build_filing_index(str(sub), str(idx_dir)))
+    assert "3 members read" in capsys.readouterr().out
+
+
+def test_mismatched_arrays_rebuild(built, capsys):
+    sub, idx_dir = built
+    day = np.load(idx_dir / "date.npy")
+    np.save(idx_dir / "date.npy", day[:-2])
+    capsys.readouterr()
+    expected(build_filing_index(str(sub), str(idx_dir)))
+    assert "3 members read" in capsys.readouterr().out
+
+
+def test_missing_array_rebuilds(built, capsys):
+    sub, idx_dir = built
+    os.remove(idx_dir / "member.npy")
+    capsys.readouterr()
+    expected(build_filing_index(str(sub), str(idx_dir)))
+    assert "3 members read" in capsys.readouterr().out
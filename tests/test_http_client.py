@@ -0,0 +1,72 @@
+import random
+import time
+
+import pytest
+
+from etl.scripts.utilities.http import SEC_MAX_RPS, HttpClient, backoff_delay
+
+
+def test_sec_hosts_share_one_bucket():
+    c = HttpClient()
+    b = c._bucket("www.sec.gov")
+    assert c._bucket("data.sec.gov") is b
+    assert c._bucket("efts.sec.gov") is b
+    assert b.rate == SEC_MAX_RPS
+    # suffix match is on whole labels only
+    assert c._bucket("notsec.gov") is not b
+    assert c._bucket("notsec.gov").rate == 0.0
+
+
+def test_longest_domain_wins():
+    c = HttpClient(rates={"sec.gov": (10.0, 1), "efts.sec.gov": (1.0, 1)})
+    assert c._bucket("efts.sec.gov").rate == 1.0
+    assert c._bucket("www.sec.gov").rate == 10.0
+    assert c._bucket("efts.sec.gov") is not c._bucket("www.sec.gov")
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retry_after_is_honoured(file_server, status):
+    srv = file_server(b"ok")
+    srv.faults = {1: status}
+    srv.extra_headers = {status: {"Retry-After": "0.5"}}
+    c = HttpClient(rates={}, backoff_base=0.0)  # any wait comes from Retry-After
+
+    t0 = time.monotonic()
+    r = c.get(srv.url)
+    elapsed = time.monotonic() - t0
+    assert r.status_code == 200 and r.content == b"ok"
+    assert elapsed >= 0.5
+    s = c.stats()["127.0.0.1"]
+    assert s.requests == 2 and s.retries == 1 and s.statuses[status] == 1
+
+
+def test_gives_up_after_retries(file_server):
+    srv = file_server(b"ok")
+    srv.faults = {"*": 503}
+    c = HttpClient(rates={}, backoff_base=0.0, retries=2)
+    assert c.get(srv.url).status_code == 503
+    assert len(srv.gets()) == 3
+
+
+def test_backoff_delay_bounds():
+    random.seed(3)
+    for attempt in range(12):
+        ceiling = min(5.0, 0.5 * 2 ** attempt)
+        delays = [backoff_delay(attempt, base=0.5, cap=5.0) for _ in range(200)]
+        assert all(0.0 <= d <= ceiling for d in delays)
+        assert max(delays) > ceiling / 2  # full jitter spreads over the whole range
+
+
+def test_yahoo_pace_interval():
+    c = HttpClient()
+    host = "query2.finance.yahoo.com"
+    rate = c._bucket(host).rate
+    assert rate > 0 and c._bucket(host) is c._bucket("query1.finance.yahoo.com")
+
+    n = 4
+    t0 = time.monotonic()
+    for _ in range(n):
+        c.pace(host)
+    # burst of 1: the first call is free, each later one waits 1/rate
+    assert time.monotonic() - t0 >= (n - 1) / rate * 0.95
+    assert c.stats()[host].throttled > 0
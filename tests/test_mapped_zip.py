@@ -0,0 +1,59 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from etl.scripts.utilities.zip import MappedZip
+
+
+def make_zip(n: int = 3) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for i in range(n):
+            z.writestr(f"CIK{i:010d}.json", b'{"facts": {}}' * 50)
+    return buf.getvalue()
+
+
+def opened(monkeypatch):
+    """Track every MappedZip's handles so a test can check they were closed."""
+    made = []
+    real_init = MappedZip.__init__
+
+    def init(self, *a, **kw):
+        made.append(self)
+        real_init(self, *a, **kw)
+
+    monkeypatch.setattr(MappedZip, "__init__", init)
+    return made
+
+
+@pytest.mark.parametrize("damage", ["truncated", "no_eocd", "bad_entry", "empty"])
+def test_bad_archive_closes_handles(tmp_path, monkeypatch, damage):
+    raw = make_zip()
+    cd = raw.rfind(b"PK\x01\x02")
+    bad = {
+        "truncated": raw[: len(raw) // 2],
+        "no_eocd": raw[:-22],
+        "bad_entry": raw[:cd] + b"XXXX" + raw[cd + 4:],
+        "empty": b"",
+    }[damage]
+    path = tmp_path / "f.zip.part"
+    path.write_bytes(bad)
+
+    made = opened(monkeypatch)
+    with pytest.raises((zipfile.BadZipFile, ValueError)):
+        MappedZip(str(path))
+    (mz,) = made
+    assert mz._fp.closed
+    assert mz._mm is None or mz._mm.closed
+    os.remove(path)  # what _verified_replace does next
+
+
+def test_good_archive_reads(tmp_path):
+    path = tmp_path / "f.zip"
+    path.write_bytes(make_zip())
+    with MappedZip(str(path)) as zf:
+        zf.check(deep=True)
+        assert len(zf) == 3
+        assert zf.read(zf.namelist()[0]).startswith(b'{"facts"')
@@ -0,0 +1,56 @@
+import pandas as pd
+import pyarrow as pa
+
+from etl.scripts.utilities.schema import Column, coerce, reason_counts
+
+SCHEMA = [
+    Column("cik", pa.int64(), nullable=False, min=1, max=9_999_999_999, clean=r"\D"),
+    Column("ticker", pa.string(), nullable=False, max_len=7, truncate=True),
+    Column("shares", pa.int64()),
+]
+
+
+def frame():
+    return pd.DataFrame({
+        "cik": ["0000320193", "x", "1374310.0", "0", None],
+        "ticker": [" AAPL ", "B", "TOOLONGTICKER", "D", "E"],
+        "shares": [1.0, 2.0, None, 4.0, 5.0],
+        # not in the schema, and not convertible to Arrow
+        "extra": [object(), {"a": 1}, [1], None, "s"],
+    }, index=[10, 11, 12, 13, 14])
+
+
+def test_clean_and_rejected_keep_the_input_index():
+    clean, rejected = coerce(frame(), SCHEMA)
+    assert clean.index.tolist() == [10, 12]
+    assert rejected.index.tolist() == [11, 13, 14]
+    assert sorted(clean.index.union(rejected.index)) == frame().index.tolist()
+
+
+def test_values_are_coerced():
+    clean, _ = coerce(frame(), SCHEMA)
+    assert clean["cik"].tolist() == [320193, 1374310]
+    assert clean["ticker"].tolist() == ["AAPL", "TOOLONG"]
+    assert list(clean.columns) == ["cik", "ticker", "shares"]
+
+
+def test_nullable_ints_stay_ints():
+    clean, _ = coerce(frame(), SCHEMA)
+    assert pa.types.is_integer(clean["shares"].dtype.pyarrow_dtype)
+    assert clean["shares"].isna().tolist() == [False, True]
+    assert clean["shares"].iloc[0] == 1
+
+
+def test_reasons():
+    _, rejected = coerce(frame(), SCHEMA)
+    assert rejected["reason"].tolist() == ["cik: not a valid int64", "cik: out of range", "cik: null"]
+    assert rejected["extra"].iloc[0] == {"a": 1}  # rejected rows are the input rows, untouched
+    assert reason_counts(rejected).count(" 1") == 3
+
+
+def test_arrow_input_stays_arrow():
+    t = pa.table({"cik": ["1", "0"], "ticker": ["A", "B"], "shares": [1, 2], "other": [1.5, 2.5]})
+    clean, rejected = coerce(t, SCHEMA)
+    assert isinstance(clean, pa.Table) and isinstance(rejected, pa.Table)
+    assert clean.column_names == ["cik", "ticker", "shares"]
+    assert rejected.column("reason").to_pylist() == ["cik: out of range"]
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from etl.scripts.securities.build_security_master import diff_snapshots
+
+COLS = ["cik", "ticker", "name"]
+
+
+def snap(rows):
+    return pd.DataFrame(rows, columns=COLS)
+
+
+def test_diff_splits_rows(tmp_path):
+    prev = tmp_path / "prev.parquet"
+    snap([(1, "A", "a"), (2, "B", "b"), (3, "C", "c")]).to_parquet(prev, index=False)
+    d = diff_snapshots(str(prev), snap([(1, "A", "a"), (2, "B", "renamed"), (4, "D", "d")]), key="cik")
+    assert d["unchanged"]["cik"].tolist() == [1]
+    assert d["changed"]["cik"].tolist() == [2]
+    assert d["added"]["cik"].tolist() == [4]
+    assert d["removed"]["cik"].tolist() == [3]
+
+
+def test_duplicate_keys_in_previous_snapshot_keep_the_last(tmp_path):
+    prev = tmp_path / "prev.parquet"
+    snap([(1, "A", "old"), (1, "A", "a"), (2, "B", "b"), (2, "B2", "b")]).to_parquet(prev, index=False)
+    d = diff_snapshots(str(prev), snap([(1, "A", "a"), (2, "B", "b")]), key="cik")
+    assert d["unchanged"]["cik"].tolist() == [1]
+    assert d["changed"]["cik"].tolist() == [2]
+    assert d["added"].empty and d["removed"].empty
+
+
+def test_no_snapshot_means_all_added():
+    curr = snap([(1, "A", "a")])
+    d = diff_snapshots("", curr, key="cik")
+    assert len(d["added"]) == 1 and d["unchanged"].empty
@@ -0,0 +1,36 @@
+import json
+
+import pandas as pd
+import pytest
+
+from etl.scripts.securities.build_security_master import _parse_nasdaqlisted, _parse_sec_tickers
+from etl.scripts.utilities.http import HttpClient
+from etl.scripts.utilities.source_cache import cached_fetch
+
+NASDAQLISTED = (
+    "Symbol|Security Name|Market Category|Test Issue|Financial Status|Round Lot Size|ETF|NextShares\r\n"
+    "AAPL|Apple Inc. - Common Stock|Q|N|N|100|N|N\r\n"
+    "NA|Nano Labs Ltd - Class A Ordinary Shares|G|N|N|100|N|N\r\n"
+    "File Creation Time: 1017202618:01|||||||\r\n"
+).encode()
+TICKERS = json.dumps({
+    "0": {"cik_str": 320193, "ticker": "aapl", "title": "Apple Inc."},
+    "1": {"cik_str": 1713445, "ticker": "NA", "title": "Nano Labs Ltd"},
+}).encode()
+
+
+@pytest.mark.parametrize("body,parse", [(NASDAQLISTED, _parse_nasdaqlisted), (TICKERS, _parse_sec_tickers)],
+                         ids=["nasdaqlisted", "sec_tickers"])
+def test_fresh_304_and_offline_frames_match(file_server, tmp_path, body, parse):
+    srv = file_server(body)
+    fetch = lambda **kw: cached_fetch("src", srv.url, parse, str(tmp_path), client=HttpClient(rates={}), **kw)
+
+    fresh = fetch()
+    not_modified = fetch()
+    offline = fetch(offline=True)
+    assert [r["headers"].get("If-None-Match") for r in srv.gets()] == [None, srv.etag]
+
+    for other in (not_modified, offline):
+        assert other.dtypes.to_dict() == fresh.dtypes.to_dict()
+        pd.testing.assert_frame_equal(other, fresh)
+    assert all(isinstance(t, pd.ArrowDtype) for t in fresh.dtypes)